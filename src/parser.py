@@ -1,14 +1,23 @@
 from functools import partial
+from itertools import repeat
 from typing import (
     Any,
     Callable,
+    ClassVar,
+    Collection,
+    Hashable,
+    NoReturn,
     Optional,
+    Sequence,
     Union,
+    cast,
 )
 
 from textwrap import indent
-from abc import ABC, abstractmethod
+from abc import ABCMeta, abstractmethod
 from pprint import pformat
+from threading import local
+from weakref import WeakValueDictionary
 
 
 def show_part(target: Any, max_len=100) -> str:
@@ -22,327 +31,964 @@ def identity(target: Any) -> Any:
     return target
 
 
+def chain_constructors(
+    first: Callable[[Any], Any], second: Callable[[Any], Any]
+) -> Callable[[Any], Any]:
+    if first is identity:
+        return second
+    if second is identity:
+        return first
+    return lambda target: second(first(target))
+
+
 class SyntaxPrasingError(ValueError): ...
 
 
-class Parser(ABC):
-    @abstractmethod
-    def parse_value(self, target, parse_blindly=False) -> Any:
+class ParseErrorMessage:
+    """Message of a `SyntaxPrasingError`, formatted on the first use.
+    Unions discard most errors of their alternatives, so those never pay for printing the target.
+    """
+    __slots__ = ("parser", "target", "additional_messages", "_text")
+
+    def __init__(
+        self, parser: "Parser", target: Any, additional_messages: "Sequence[str | ParseErrorMessage] | None" = None
+    ) -> None:
+        self.parser = parser
+        self.target = target
+        self.additional_messages = additional_messages
+        self._text: Optional[str] = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = (
+                f"Failed to parse {show_part(self.target)}, expected \n{self.parser.get_syntax_string(True)}"
+                + ("" if self.additional_messages is None
+                else ("\n" + "\n".join(map(str, self.additional_messages))))
+            )
+        return self._text
+
+    def __repr__(self) -> str:
+        return repr(str(self))
+
+
+# Item types for which `ListOf(Type(...))` and `DictOf(Type(...))` are checked without calling the item parser
+HOMOGENEOUS_TYPES = (int, float, str, bool)
+
+
+def get_homogeneous_types(matcher: "Parser") -> Optional[frozenset[type]]:
+    """Containers of plain scalars are checked at once by collecting the types of their items."""
+    if type(matcher) is Type and matcher.type in HOMOGENEOUS_TYPES and matcher.constructor is identity:
+        return frozenset((matcher.type,))
+    return None
+
+# Compiled functions shared by structurally equal parsers, kept while any parser still uses them
+_COMPILED_CACHE: "WeakValueDictionary[Hashable, Callable[[Any], Any]]" = WeakValueDictionary()
+
+
+# Outcomes of recursive scoped parsers within the running `parse_value` call of the thread,
+# by parser and target identity. Unions may parse the same subtree with several alternatives,
+# without this nested recursive structures would be parsed exponentially many times.
+# Successes are kept as well, since an alternative may fail only after parsing a whole subtree,
+# so an object found several times within the target is parsed once and shares the result.
+_PARSE_MEMO = local()
+
+# Parsers whose `compile` is running, references back to them (recursive scopes) are resolved lazily
+_COMPILING: set[int] = set()
+
+# Parsers built so far by their class and arguments, kept while the parsers are in use
+_INTERNED: "WeakValueDictionary[Hashable, Parser]" = WeakValueDictionary()
+
+
+def freeze_argument(argument: Any) -> Hashable:
+    """Turns constructor arguments into a hashable key, pairing values with their types to keep 1, 1.0 and True apart."""
+    if type(argument) is dict:
+        return (dict, tuple((freeze_argument(key), freeze_argument(value)) for key, value in argument.items()))
+    if type(argument) is list or type(argument) is tuple:
+        return (type(argument), tuple(map(freeze_argument, argument)))
+    if isinstance(argument, Parser) and not argument._interned:
+        # Keys are held strongly, a parser outside of the table (such as a scoped reference)
+        # may lead back to the interned parser through its scope and keep it alive forever
+        raise TypeError("parsers which are not interned can not be a part of the key")
+    return (type(argument), argument)
+
+
+class ParserMeta(ABCMeta):
+    _is_interned: bool
+
+    def __call__(cls, *args: Any, **kwargs: Any) -> Any:
+        """Returns the parser already built from equal arguments, parsers are immutable and can be shared."""
+        if not cls._is_interned:
+            return super().__call__(*args, **kwargs)
+
+        try:
+            key = (cls, freeze_argument(args), freeze_argument(sorted(kwargs.items())))
+            parser = _INTERNED.get(key)
+        except TypeError:  # unhashable arguments, such as constants holding lists
+            return super().__call__(*args, **kwargs)
+
+        if parser is None:
+            parser = _INTERNED[key] = super().__call__(*args, **kwargs)
+            parser._interned = True
+        return parser
+
+
+class Parser(metaclass=ParserMeta):
+    __slots__ = ("_compiled", "_syntax_short", "_syntax_full", "_interned", "__weakref__")
+
+    _is_interned: ClassVar[bool] = True
+
+    def __init__(self) -> None:
+        self._interned = False
+        self._compiled: Optional[Callable[[Any], Any]] = None
+        self._syntax_short: Optional[str] = None
+        self._syntax_full: Optional[str] = None
+
+    def parse_value(self, target) -> Any:
         """Check that value is matching and attempt to compile it to an object via constructor.
-        Uses `parse_blindly` to avoid matching the structure multiple times.
+        The compiled function checks and constructs the value in a single walk over its structure.
+        Within recursive scopes an object found several times in the target may be parsed only once,
+        so parts of the result may be shared, callers should not depend on either behavior.
+        """
+        if getattr(_PARSE_MEMO, "outcomes", None) is not None:
+            return self.get_compiled()(target)
+
+        _PARSE_MEMO.outcomes = {}
+        try:
+            return self.get_compiled()(target)
+        except SyntaxPrasingError as err:
+            # Only the error leaving the call is formatted, before the caller may change the target,
+            # and it carries a plain string like any other exception
+            err.args = (str(err.args[0]),)
+            raise
+        finally:
+            _PARSE_MEMO.outcomes = None
+
+    def get_compiled(self) -> Callable[[Any], Any]:
+        """Returns the function built by `compile`, building it on the first call."""
+        if self._compiled is None:
+            key = self.get_structure_key()
+            try:
+                compiled = None if key is None else _COMPILED_CACHE.get(key)
+            except TypeError:  # unhashable constructor or value somewhere in the tree
+                key, compiled = None, None
+
+            if compiled is None:
+                _COMPILING.add(id(self))
+                try:
+                    compiled = self.compile()
+                finally:
+                    _COMPILING.discard(id(self))
+                if key is not None:
+                    _COMPILED_CACHE[key] = compiled
+            self._compiled = compiled
+        return self._compiled
+
+    def get_structure_key(self) -> Optional[Hashable]:
+        """Returns a key equal for parsers of the same structure, `None` if the compiled function can not be shared."""
+        return None
+
+    @abstractmethod
+    def compile(self) -> Callable[[Any], Any]:
+        """Builds a function which checks the value and applies the constructors in a single walk.
+        Raises `SyntaxPrasingError` the same way as `parse_value`.
         """
 
     @abstractmethod
     def is_matching(self, target, shallow = False) -> bool:
         """Checks whether some value is matching the specified structure."""
 
-    @abstractmethod
+    def get_target_types(self) -> Optional[frozenset[type]]:
+        """Returns the exact types of values this parser may accept, `None` if it can not be told upfront."""
+        return None
+
+    def is_shallow_match_complete(self) -> bool:
+        """Whether a shallow `is_matching` already guarantees that parsing succeeds."""
+        return False
+
+    def is_matching_whole_type(self, type_: type) -> bool:
+        """Whether every value of exactly this type is matched, so that checking the type alone is enough."""
+        return False
+
     def get_syntax_string(self, continue_: bool) -> str:
         """Returns a string representation of the syntax structure for readability purposes.
 
         `continue_` is used to trim nesting and avoid recursion
         """
+        # Parsers do not change after construction, so both variants are built at most once
+        if continue_:
+            if self._syntax_full is None:
+                self._syntax_full = self.build_syntax_string(True)
+            return self._syntax_full
 
-    def raise_parse_error(self, target, additional_messages: list[str] | None = None):
-        raise SyntaxPrasingError(
-            f"Failed to parse {show_part(target)}, expected \n{self.get_syntax_string(True)}"
-            + ("" if additional_messages is None
-            else ("\n" + "\n".join(additional_messages)))
-        )
+        if self._syntax_short is None:
+            self._syntax_short = self.build_syntax_string(False)
+        return self._syntax_short
+
+    @abstractmethod
+    def build_syntax_string(self, continue_: bool) -> str:
+        """Builds the string returned by `get_syntax_string`."""
+
+    def raise_parse_error(
+        self, target, additional_messages: "Sequence[str | ParseErrorMessage] | None" = None
+    ) -> NoReturn:
+        raise SyntaxPrasingError(ParseErrorMessage(self, target, additional_messages))
 
 
 class Type(Parser):
+    __slots__ = ("type", "constructor")
+
     def __init__(
         self, type_: Any, constructor: Optional[Callable[[Any], Any]] = None
     ) -> None:
+        super().__init__()
         self.type = type_
         self.constructor = constructor or (identity)
 
     def is_matching(self, target: Any, shallow = False) -> bool:
         return type(target) is self.type
 
-    def get_syntax_string(self, continue_=False) -> str:
+    def get_target_types(self) -> Optional[frozenset[type]]:
+        return frozenset((self.type,))
+
+    def is_matching_whole_type(self, type_: type) -> bool:
+        return type_ is self.type
+
+    def get_structure_key(self) -> Optional[Hashable]:
+        return ("T", self.type, self.constructor)
+
+    def is_shallow_match_complete(self) -> bool:
+        return True
+
+    def build_syntax_string(self, continue_: bool) -> str:
         return f"{self.type.__name__}"
 
-    def parse_value(self, target: Any, parse_blindly=False) -> Any:
-        if not self.is_matching(target):
-            self.raise_parse_error(target)
+    def compile(self) -> Callable[[Any], Any]:
+        type_, constructor, raise_parse_error = self.type, self.constructor, self.raise_parse_error
+        has_constructor = constructor is not identity
+
+        def parse(target: Any) -> Any:
+            if type(target) is not type_:
+                raise_parse_error(target)
+            return constructor(target) if has_constructor else target
 
-        return self.constructor(target)
+        return parse
 
 
 class Enumerated(Parser):
+    __slots__ = ("values", "constructor", "_typed_values", "_unhashable_values")
+
     def __init__(
         self, values: list[Any], constructor: Optional[Callable[[Any], Any]] = None
     ) -> None:
-        self.values = set(values)
-        self.types = {type(x).__qualname__ for x in values}
+        super().__init__()
         self.constructor = constructor or (identity)
+        # Pairs with the exact type, so that values such as 1, 1.0 and True stay distinct,
+        # enumerations of unhashable values (such as lists) are compared one by one instead
+        self._typed_values: Optional[frozenset[tuple[type, Any]]]
+        self._unhashable_values: Optional[tuple[Any, ...]]
+        try:
+            self.values: Union[set[Any], list[Any]] = set(values)
+            self._typed_values = frozenset((type(x), x) for x in values)
+            self._unhashable_values = None
+        except TypeError:
+            self.values = list(values)
+            self._typed_values = None
+            self._unhashable_values = tuple(values)
 
     def is_matching(self, target: Any, shallow = False) -> bool:
-        if type(target).__qualname__ not in self.types:
+        if self._unhashable_values is not None:
+            return any(type(value) is type(target) and value == target for value in self._unhashable_values)
+
+        try:
+            return (type(target), target) in cast(frozenset, self._typed_values)
+        except TypeError:  # unhashable targets are never among the values
             return False
 
-        return target in self.values
+    def get_target_types(self) -> Optional[frozenset[type]]:
+        return frozenset(map(type, self.values))
+
+    def get_structure_key(self) -> Optional[Hashable]:
+        return None if self._typed_values is None else ("E", self._typed_values, self.constructor)
+
+    def is_shallow_match_complete(self) -> bool:
+        return True
 
-    def get_syntax_string(self, continue_=False) -> str:
+    def build_syntax_string(self, continue_: bool) -> str:
         return f"enum{pformat(self.values)}"
 
-    def parse_value(self, target: Any, parse_blindly=False) -> Any:
-        if not self.is_matching(target):
-            self.raise_parse_error(target)
+    def compile(self) -> Callable[[Any], Any]:
+        typed_values = self._typed_values
+        constructor, raise_parse_error = self.constructor, self.raise_parse_error
+        has_constructor = constructor is not identity
+
+        if typed_values is None:
+            is_matching = self.is_matching
+
+            def parse_unhashable(target: Any) -> Any:
+                if not is_matching(target):
+                    raise_parse_error(target)
+                return constructor(target) if has_constructor else target
+
+            return parse_unhashable
+
+        def parse(target: Any) -> Any:
+            try:
+                is_matching = (type(target), target) in typed_values
+            except TypeError:
+                is_matching = False
 
-        return self.constructor(target)
+            if not is_matching:
+                raise_parse_error(target)
+            return constructor(target) if has_constructor else target
+
+        return parse
 
 
 class Const(Parser):
+    __slots__ = ("value", "constructor")
+
     def __init__(
         self, value: Any, constructor: Optional[Callable[[Any], Any]] = None
     ) -> None:
+        super().__init__()
         self.value = value
         self.constructor = constructor or (identity)
 
     def is_matching(self, target: Any, shallow = False) -> bool:
         return target == self.value
 
-    def get_syntax_string(self, continue_=False) -> str:
+    def get_target_types(self) -> Optional[frozenset[type]]:
+        # Other values may be equal to instances of several types (e.g. 1 == 1.0 == True)
+        return frozenset((type(None),)) if self.value is None else None
+
+    def is_matching_whole_type(self, type_: type) -> bool:
+        return self.value is None and type_ is type(None)
+
+    def get_structure_key(self) -> Optional[Hashable]:
+        # The type keeps constants such as 1, 1.0 and True apart, as their error messages differ
+        return ("C", type(self.value), self.value, self.constructor)
+
+    def is_shallow_match_complete(self) -> bool:
+        return True
+
+    def build_syntax_string(self, continue_: bool) -> str:
         return f"const{self.value}"
 
-    def parse_value(self, target: Any, parse_blindly=False) -> Any:
-        if not self.is_matching(target):
-            self.raise_parse_error(target)
+    def compile(self) -> Callable[[Any], Any]:
+        value, constructor, raise_parse_error = self.value, self.constructor, self.raise_parse_error
+        has_constructor = constructor is not identity
 
-        return self.constructor(target)
+        def parse(target: Any) -> Any:
+            if target != value:
+                raise_parse_error(target)
+            return constructor(target) if has_constructor else target
+
+        return parse
 
 
 class Identity(Parser):
+    __slots__ = ("matcher", "constructor")
+
+    matcher: Parser
+    constructor: Callable[[Any], Any]
+
     def __init__(
         self, matcher: Parser, constructor: Optional[Callable[[Any], Any]] = None
     ) -> None:
+        super().__init__()
+        constructor = constructor or (identity)
+
+        # Nested wrappers are collapsed into a single one, chaining their constructors
+        while type(matcher) is Identity:
+            constructor = chain_constructors(matcher.constructor, constructor)
+            matcher = matcher.matcher
+
         self.matcher = matcher
-        self.constructor = constructor or (identity)
+        self.constructor = constructor
 
     def is_matching(self, target: Any, shallow = False) -> bool:
         return self.matcher.is_matching(target, shallow)
 
-    def get_syntax_string(self, continue_=False) -> str:
+    def get_target_types(self) -> Optional[frozenset[type]]:
+        return self.matcher.get_target_types()
+
+    def is_shallow_match_complete(self) -> bool:
+        return self.matcher.is_shallow_match_complete()
+
+    def is_matching_whole_type(self, type_: type) -> bool:
+        return self.matcher.is_matching_whole_type(type_)
+
+    def build_syntax_string(self, continue_: bool) -> str:
         return self.matcher.get_syntax_string(continue_)
 
-    def parse_value(self, target: Any, parse_blindly=False) -> Any:
-        if not self.is_matching(target):
-            self.raise_parse_error(target)
+    def get_structure_key(self) -> Optional[Hashable]:
+        inner_key = self.matcher.get_structure_key()
+        return None if inner_key is None else ("I", inner_key, self.constructor)
+
+    def compile(self) -> Callable[[Any], Any]:
+        parse_inner, constructor = self.matcher.get_compiled(), self.constructor
+        if constructor is identity:
+            return parse_inner
+
+        def parse(target: Any) -> Any:
+            return constructor(parse_inner(target))
 
-        return self.constructor(self.matcher.parse_value(target, parse_blindly=True))
+        return parse
+
+
+def allow_any_key(key: str) -> bool:
+    """Default `DictOf.key_is_allowed`, recognized by identity so that the keys are not checked at all."""
+    return True
 
 
 class DictOf(Parser):
+    __slots__ = ("matcher", "constructor", "key_is_allowed", "allowed_keys", "_item_types")
+
     def __init__(
         self,
         matcher: Parser,
         constructor: Optional[Callable[[dict], Any]] = None,
         key_is_allowed: Optional[Callable[[str], bool]] = None,
+        allowed_keys: Optional[Collection[str]] = None,
     ) -> None:
+        super().__init__()
+        if isinstance(allowed_keys, str):
+            raise TypeError(f"allowed_keys expects a collection of keys, got the string {allowed_keys!r}")
+
         self.matcher = matcher
         self.constructor = constructor or (identity)
-        self.key_is_allowed = key_is_allowed or (lambda _: True)
+        self.key_is_allowed = key_is_allowed or allow_any_key
+        # Checked as a set in one go instead of calling a predicate per key
+        self.allowed_keys = None if allowed_keys is None else frozenset(allowed_keys)
+        self._item_types = get_homogeneous_types(matcher)
 
     def is_matching(self, target: Any, shallow = False) -> bool:
         if type(target) is not dict:
             return False
 
-        if not all(self.key_is_allowed(key) for key in target):
+        if self.allowed_keys is not None and not target.keys() <= self.allowed_keys:
+            return False
+
+        if self.key_is_allowed is not allow_any_key and not all(map(self.key_is_allowed, target)):
             return False
 
-        return all(self.matcher.is_matching(value, shallow) for value in target.values())
+        if self._item_types is not None:
+            return set(map(type, target.values())) <= self._item_types
+
+        return all(map(self.matcher.is_matching, target.values(), repeat(shallow)))
+
+    def get_target_types(self) -> Optional[frozenset[type]]:
+        return frozenset((dict,))
 
-    def get_syntax_string(self, continue_=False) -> str:
+    def build_syntax_string(self, continue_: bool) -> str:
         return "{ [str]: " + self.matcher.get_syntax_string(continue_) + " }"
 
-    def parse_value(self, target: Any, parse_blindly=False) -> Any:
-        if type(target) is dict:
-            additional_messages = [f'Unexpected key "{key}"' for key in target.keys() if not self.key_is_allowed(key)]
-            if additional_messages:
-                self.raise_parse_error(target, additional_messages)
-        else:
-            self.raise_parse_error(target)
-
-        return self.constructor(
-            {
-                key: self.matcher.parse_value(value, parse_blindly)
-                for key, value in target.items()
-            }
+    def get_structure_key(self) -> Optional[Hashable]:
+        inner_key = self.matcher.get_structure_key()
+        return None if inner_key is None else (
+            "DO", inner_key, self.constructor, self.key_is_allowed, self.allowed_keys
         )
 
+    def compile(self) -> Callable[[Any], Any]:
+        parse_inner, key_is_allowed = self.matcher.get_compiled(), self.key_is_allowed
+        allowed_keys, item_types = self.allowed_keys, self._item_types
+        constructor, raise_parse_error = self.constructor, self.raise_parse_error
+        has_constructor = constructor is not identity
+
+        def parse(target: Any) -> Any:
+            if type(target) is not dict:
+                raise_parse_error(target)
+
+            if allowed_keys is not None and not target.keys() <= allowed_keys:
+                raise_parse_error(
+                    target, [f'Unexpected key "{key}"' for key in target if key not in allowed_keys]
+                )
+
+            if key_is_allowed is not allow_any_key:
+                additional_messages = [f'Unexpected key "{key}"' for key in target if not key_is_allowed(key)]
+                if additional_messages:
+                    raise_parse_error(target, additional_messages)
+
+            if item_types is not None and set(map(type, target.values())) <= item_types:
+                result = target.copy()
+            else:
+                # Otherwise the values are parsed one by one, failing with the message of the first mismatch
+                result = {key: parse_inner(value) for key, value in target.items()}
+            return constructor(result) if has_constructor else result
+
+        return parse
+
 
 class ListOf(Parser):
+    __slots__ = ("matcher", "constructor", "_item_types")
+
     def __init__(
         self, matcher: Parser, constructor: Optional[Callable[[list], Any]] = None
     ) -> None:
+        super().__init__()
         self.matcher = matcher
         self.constructor = constructor or (identity)
+        self._item_types = get_homogeneous_types(matcher)
 
     def is_matching(self, target: Any, shallow = False) -> bool:
         if type(target) is not list:
             return False
 
-        return all(self.matcher.is_matching(v) for v in target)
+        if shallow:
+            return True
 
-    def get_syntax_string(self, continue_=False) -> str:
+        if self._item_types is not None:
+            return set(map(type, target)) <= self._item_types
+
+        return all(map(self.matcher.is_matching, target))
+
+    def get_target_types(self) -> Optional[frozenset[type]]:
+        return frozenset((list,))
+
+    def build_syntax_string(self, continue_: bool) -> str:
         return f"{self.matcher.get_syntax_string(continue_)}[]"
 
-    def parse_value(self, target: Any, parse_blindly=False) -> Any:
-        if not parse_blindly and not self.is_matching(target):
-            self.raise_parse_error(target)
+    def get_structure_key(self) -> Optional[Hashable]:
+        inner_key = self.matcher.get_structure_key()
+        return None if inner_key is None else ("L", inner_key, self.constructor)
 
-        return self.constructor(
-            [self.matcher.parse_value(value, parse_blindly=True) for value in target]
-        )
+    def compile(self) -> Callable[[Any], Any]:
+        parse_inner, item_types = self.matcher.get_compiled(), self._item_types
+        constructor, raise_parse_error = self.constructor, self.raise_parse_error
+        has_constructor = constructor is not identity
+
+        if item_types is not None:
+            def parse_homogeneous(target: Any) -> Any:
+                if type(target) is not list:
+                    raise_parse_error(target)
+                if set(map(type, target)) <= item_types:
+                    result = target.copy()
+                else:
+                    # Fails on the first mismatching item with its own error message
+                    result = [parse_inner(value) for value in target]
+                return constructor(result) if has_constructor else result
+
+            return parse_homogeneous
+
+        def parse(target: Any) -> Any:
+            if type(target) is not list:
+                raise_parse_error(target)
+            result = [parse_inner(value) for value in target]
+            return constructor(result) if has_constructor else result
+
+        return parse
 
 
 class Opt(Parser):
+    __slots__ = ("matcher",)
+
     def __init__(self, matcher: Parser) -> None:
+        super().__init__()
         self.matcher = matcher
 
-    def parse_value(self, target, parse_blindly=False) -> Any:
-        return self.matcher.parse_value(target, parse_blindly)
+    def compile(self) -> Callable[[Any], Any]:
+        return self.matcher.get_compiled()
 
     def is_matching(self, target, shallow = False) -> bool:
         return self.matcher.is_matching(target, shallow)
 
-    def get_syntax_string(self, continue_: bool) -> str:
+    def get_target_types(self) -> Optional[frozenset[type]]:
+        return self.matcher.get_target_types()
+
+    def is_shallow_match_complete(self) -> bool:
+        return self.matcher.is_shallow_match_complete()
+
+    def is_matching_whole_type(self, type_: type) -> bool:
+        return self.matcher.is_matching_whole_type(type_)
+
+    def build_syntax_string(self, continue_: bool) -> str:
         return self.matcher.get_syntax_string(continue_)
 
 
 class DictExp(Parser):
+    __slots__ = (
+        "types_dict", "constructor", "_optional", "_allowed", "_required", "_required_pairs", "_optional_pairs"
+    )
+
     def __init__(
         self,
         types_dict: dict[Any, Union[Parser, Opt]],
         constructor: Optional[Callable[[dict], Any]] = None,
     ) -> None:
-        self.types_dict = types_dict
+        super().__init__()
+        # `Opt` wrappers are only markers, the keys are recorded in `_optional` and the parsers are unwrapped
+        self.types_dict: dict[Any, Parser] = {
+            key: matcher.matcher if type(matcher) is Opt else matcher
+            for key, matcher in types_dict.items()
+        }
         self.constructor = constructor or (identity)
+        self._optional = frozenset(key for key, matcher in types_dict.items() if type(matcher) is Opt)
+        self._allowed = frozenset(types_dict)
+        self._required = self._allowed - self._optional
+        self._required_pairs = tuple(
+            (key, matcher.is_matching) for key, matcher in self.types_dict.items() if key in self._required
+        )
+        self._optional_pairs = tuple(
+            (key, matcher.is_matching) for key, matcher in self.types_dict.items() if key in self._optional
+        )
 
     def is_matching(self, target, shallow = False) -> bool:
         if type(target) is not dict:
             return False
 
-        for key in target.keys():
-            if key not in self.types_dict:
-                return False
-
-        for key, matcher in self.types_dict.items():
-            if type(matcher) is not Opt and key not in target:
-                return False
+        if not target.keys() <= self._allowed or not self._required <= target.keys():
+            return False
 
         if not shallow:
-            for key, matcher in self.types_dict.items():
-                if type(matcher) is Opt:
-                    if key not in target:
-                        continue
-                if not matcher.is_matching(target[key]):
+            for key, is_matching in self._required_pairs:
+                if not is_matching(target[key]):
+                    return False
+
+            for key, is_matching in self._optional_pairs:
+                if key in target and not is_matching(target[key]):
                     return False
 
         return True
 
-    def get_syntax_string(self, continue_=False) -> str:
+    def get_target_types(self) -> Optional[frozenset[type]]:
+        return frozenset((dict,))
+
+    def build_syntax_string(self, continue_: bool) -> str:
         return indent(
             "{"
             + "".join(
-                [
-                    "\n  " + (
-                        f"{key}: ?({matcher.matcher.get_syntax_string(continue_)})"
-                        if type(matcher) is Opt
-                        else f"{key}: {matcher.get_syntax_string(continue_)}"
-                    )  + ","
-                    for key, matcher in self.types_dict.items()
-                ]
+                "\n  " + (
+                    f"{key}: ?({matcher.get_syntax_string(continue_)})"
+                    if key in self._optional
+                    else f"{key}: {matcher.get_syntax_string(continue_)}"
+                )  + ","
+                for key, matcher in self.types_dict.items()
             )
             + "\n}",
             "  "
         )
 
-    def parse_value(self, target: Any, parse_blindly=False) -> Any:
-        if type(target) is dict:
-            additional_messages = [f'Unexpected key "{key}"' for key in target.keys() if key not in self.types_dict]
-            additional_messages.extend([
-                f'Expected key "{key}"'
-                for key in self.types_dict.keys()
-                if (type(self.types_dict[key]) is not Opt) and (key not in target)
-            ])
-            if len(additional_messages) > 0:
-                self.raise_parse_error(target, additional_messages)
-        else:
-            self.raise_parse_error(target)
-
-        return self.constructor({
-            key: (
-                matcher.matcher.parse_value(target[key], parse_blindly=True)
-                if type(matcher) is Opt
-                else matcher.parse_value(target[key], parse_blindly=True)
-            )
-            for key, matcher in self.types_dict.items()
-            if key in target
-        })
+    def get_structure_key(self) -> Optional[Hashable]:
+        # Keys stay in declaration order, it defines the order of keys in the result,
+        # and are paired with their types, so that 1 and True are not bound to each other's functions
+        items = []
+        for key, matcher in self.types_dict.items():
+            matcher_key = matcher.get_structure_key()
+            if matcher_key is None:
+                return None
+            items.append((type(key), key, key in self._optional, matcher_key))
+        return ("D", tuple(items), self.constructor)
+
+    def get_key_messages(self, target: dict) -> list[str]:
+        """Lists unexpected and missing keys of the target, used for error messages."""
+        # Iterates the dicts instead of using set differences to keep the messages in a stable order
+        additional_messages = [f'Unexpected key "{key}"' for key in target if key not in self._allowed]
+        additional_messages.extend(
+            f'Expected key "{key}"' for key in self.types_dict if key in self._required and key not in target
+        )
+        return additional_messages
+
+    def compile(self) -> Callable[[Any], Any]:
+        # Generates a straight-line function with every key check and child call unrolled,
+        # keys and child parsers are bound as globals of the generated function.
+        # Plain type checks are inlined, the child parser is only called to report the error.
+        namespace: dict[str, Any] = {
+            "allowed": self._allowed,
+            "required": self._required,
+            "constructor": self.constructor,
+            "raise_parse_error": self.raise_parse_error,
+            "get_key_messages": self.get_key_messages,
+        }
+        result_items: list[str] = []
+        result_statements: list[str] = []
+
+        for index, (key, matcher) in enumerate(self.types_dict.items()):
+            namespace[f"_k{index}"] = key
+            namespace[f"_p{index}"] = matcher.get_compiled()
+
+            if type(matcher) is Type and matcher.constructor is identity:
+                namespace[f"_t{index}"] = matcher.type
+                value = f"(_v if type(_v := target[_k{index}]) is _t{index} else _p{index}(_v))"
+            else:
+                value = f"_p{index}(target[_k{index}])"
+
+            if key in self._optional:
+                result_statements.append(
+                    f"    if _k{index} in target:\n"
+                    f"        result[_k{index}] = {value}\n"
+                )
+                continue
+
+            if result_statements:
+                result_statements.append(f"    result[_k{index}] = {value}\n")
+            else:
+                result_items.append(f"_k{index}: {value}")
+
+        source = (
+            "def parse(target):\n"
+            "    if type(target) is not dict:\n"
+            "        raise_parse_error(target)\n"
+            "    if not target.keys() <= allowed or not required <= target.keys():\n"
+            "        raise_parse_error(target, get_key_messages(target))\n"
+            f"    result = {{{', '.join(result_items)}}}\n"
+            + "".join(result_statements)
+            + ("    return constructor(result)\n" if self.constructor is not identity else "    return result\n")
+        )
+        exec(compile(source, f"<DictExp {id(self):#x}>", "exec"), namespace)
+        return namespace["parse"]
 
 
 class UnionExp(Parser):
+    __slots__ = ("matchers", "constructor", "_by_type", "_untyped", "_discriminator")
+
+    matchers: tuple[Parser, ...]
+    constructor: Callable[[Any], Any]
+
     def __init__(
         self, *matchers: Parser, constructor: Optional[Callable[[Any], Any]] = None
     ) -> None:
-        self.matchers = matchers
+        super().__init__()
+        # Nested unions without a constructor try the same alternatives in the same order,
+        # so their alternatives are taken over directly
+        self.matchers = tuple(
+            alternative
+            for matcher in matchers
+            for alternative in (
+                matcher.matchers
+                if type(matcher) is UnionExp and matcher.constructor is identity
+                else (matcher,)
+            )
+        )
         self.constructor = constructor or (identity)
+        matchers = self.matchers
+
+        # Alternatives which may accept a value of the given type, in declaration order,
+        # values of other types are only tried against alternatives with unknown types
+        target_types = [(matcher, matcher.get_target_types()) for matcher in matchers]
+        known_types = frozenset().union(*(types for _, types in target_types if types is not None))
+        self._by_type = {
+            type_: tuple(matcher for matcher, types in target_types if types is None or type_ in types)
+            for type_ in known_types
+        }
+        self._untyped = tuple(matcher for matcher, types in target_types if types is None)
+        self._discriminator = self._find_discriminator(matchers)
+
+    @staticmethod
+    def _find_discriminator(matchers: tuple[Parser, ...]) -> Optional[tuple[Any, dict[Any, "DictExp"]]]:
+        """For a union of DictExp tagged by a required constant key, maps every tag value to its alternative."""
+        if not matchers or any(type(matcher) is not DictExp for matcher in matchers):
+            return None
+
+        dict_matchers = cast(tuple[DictExp, ...], matchers)
+        for key in dict_matchers[0].types_dict:
+            if any(key not in matcher._required for matcher in dict_matchers):
+                continue
+
+            tags = [matcher.types_dict[key] for matcher in dict_matchers]
+            if any(type(tag) is not Const for tag in tags):
+                continue
+
+            try:
+                by_tag = {cast(Const, tag).value: matcher for tag, matcher in zip(tags, dict_matchers)}
+            except TypeError:  # unhashable constant
+                continue
+
+            if len(by_tag) == len(dict_matchers):
+                return key, by_tag
+
+        return None
 
     def is_matching(self, target: Any, shallow = False) -> bool:
-        return any(matcher.is_matching(target, shallow) for matcher in self.matchers)
+        if self._discriminator is not None:
+            key, by_tag = self._discriminator
+            if type(target) is not dict:
+                return False
+            try:
+                matcher = by_tag.get(target.get(key))
+            except TypeError:
+                return False
+            return matcher is not None and matcher.is_matching(target, shallow)
 
-    def get_syntax_string(self, continue_=False) -> str:
-        return indent("".join(["\n| " + m.get_syntax_string(continue_).lstrip(" ") for m in self.matchers]), "  ")
+        return any(
+            matcher.is_matching(target, shallow)
+            for matcher in self._by_type.get(type(target), self._untyped)
+        )
 
-    def parse_value(self, target: Any, parse_blindly=False) -> Any:
-        messages: list[str] = []
+    def get_target_types(self) -> Optional[frozenset[type]]:
+        return None if self._untyped else frozenset(self._by_type)
+
+    def get_structure_key(self) -> Optional[Hashable]:
+        matcher_keys = tuple(matcher.get_structure_key() for matcher in self.matchers)
+        return None if None in matcher_keys else ("U", matcher_keys, self.constructor)
+
+    def build_syntax_string(self, continue_: bool) -> str:
+        return indent("".join("\n| " + m.get_syntax_string(continue_).lstrip(" ") for m in self.matchers), "  ")
+
+    def compile(self) -> Callable[[Any], Any]:
+        def get_alternatives(
+            matchers: tuple[Parser, ...], type_: Optional[type] = None
+        ) -> tuple[tuple[Optional[Callable], Callable, bool], ...]:
+            # Alternatives matching any value of the dispatched type need no check
+            return tuple(
+                (
+                    None if type_ is not None and matcher.is_matching_whole_type(type_) else matcher.is_matching,
+                    matcher.get_compiled(),
+                    matcher.is_shallow_match_complete(),
+                )
+                for matcher in matchers
+            )
 
-        for matcher in self.matchers:
-            if matcher.is_matching(target, True):
+        alternatives_by_type = {type_: get_alternatives(matchers, type_) for type_, matchers in self._by_type.items()}
+        untyped_alternatives = get_alternatives(self._untyped)
+        constructor, raise_parse_error = self.constructor, self.raise_parse_error
+        has_constructor = constructor is not identity
+
+        # Unions of plain types (and null) are parsed by the alternative found for the type of the value
+        direct_by_type = {
+            type_: alternatives[0][1] for type_, alternatives in alternatives_by_type.items() if alternatives[0][0] is None
+        }
+        if not self._untyped and len(direct_by_type) == len(alternatives_by_type) and self._discriminator is None:
+            def parse_by_type(target: Any) -> Any:
+                parse_alternative = direct_by_type.get(type(target))
+                if parse_alternative is None:
+                    raise_parse_error(target, [])
+                result = parse_alternative(target)
+                return constructor(result) if has_constructor else result
+
+            return parse_by_type
+
+        if self._discriminator is not None:
+            key = self._discriminator[0]
+            parse_by_tag = {tag: matcher.get_compiled() for tag, matcher in self._discriminator[1].items()}
+
+            def parse_tagged(target: Any) -> Any:
+                if type(target) is not dict:
+                    raise_parse_error(target)
                 try:
-                    parsed = matcher.parse_value(target)
-                    return self.constructor(parsed)
+                    parse_alternative = parse_by_tag.get(target.get(key))
+                except TypeError:
+                    parse_alternative = None
+                if parse_alternative is None:
+                    raise_parse_error(target)
+
+                try:
+                    result = parse_alternative(target)
+                except SyntaxPrasingError as err:
+                    raise_parse_error(target, [err.args[0]])
+                return constructor(result) if has_constructor else result
+
+            return parse_tagged
+
+        def parse(target: Any) -> Any:
+            messages: list[str | ParseErrorMessage] = []
+
+            for is_matching, parse_alternative, is_complete in alternatives_by_type.get(type(target), untyped_alternatives):
+                if is_matching is not None and not is_matching(target, True):
+                    continue
+
+                # Leaf alternatives can not fail once matched, so they skip the error bookkeeping
+                if is_complete:
+                    result = parse_alternative(target)
+                    return constructor(result) if has_constructor else result
+
+                try:
+                    result = parse_alternative(target)
+                    return constructor(result) if has_constructor else result
                 except SyntaxPrasingError as err:
                     messages.append(err.args[0])
-        else:
-            self.raise_parse_error(target, messages)
+
+            raise_parse_error(target, messages)
+
+        return parse
 
 
 class Scoped(Parser):
+    __slots__ = ("scope", "name", "constructor", "_resolved")
+
+    # Resolved lazily, each scope keeps its own instances
+    _is_interned = False
+
     def __init__(
         self,
         scope: "Scope",
         name: str,
         constructor: Optional[Callable[[Any], Any]] = None,
     ) -> None:
+        super().__init__()
         self.scope = scope
         self.name = name
         self.constructor = constructor or (identity)
+        self._resolved: Optional[Parser] = None
+
+    def _resolve(self) -> Parser:
+        self._resolved = self.scope.get_scoped_parser(self.name)
+        return self._resolved
 
     def is_matching(self, target: Any, shallow = False) -> bool:
-        return self.scope.get_scoped_parser(self.name).is_matching(target, shallow)
+        return (self._resolved or self._resolve()).is_matching(target, shallow)
 
-    def get_syntax_string(self, continue_=False) -> str:
+    def build_syntax_string(self, continue_: bool) -> str:
         if not continue_:
             return f"{self.scope.scope_name}::{self.name}"
 
         return indent(
             f"{self.scope.scope_name}::{self.name} = \n"
-            + self.scope.get_scoped_parser(self.name).get_syntax_string(False),
+            + (self._resolved or self._resolve()).get_syntax_string(False),
             "  "
         )
 
-    def parse_value(self, target: Any, parse_blindly=False) -> Any:
-        return self.constructor(
-            self.scope.get_scoped_parser(self.name).parse_value(target, parse_blindly)
-        )
+    def compile(self) -> Callable[[Any], Any]:
+        constructor = self.constructor
+        has_constructor = constructor is not identity
+        resolved = self._resolved or self._resolve()
+
+        # Outside of recursion the scoped parser is called directly, without a wrapper when there is no constructor
+        if id(resolved) not in _COMPILING:
+            parse_inner = resolved.get_compiled()
+            if not has_constructor:
+                return parse_inner
+
+            def parse_direct(target: Any) -> Any:
+                return constructor(parse_inner(target))
+
+            return parse_direct
+
+        # A recursive reference, the parser it points to is still being compiled and is taken on the first call
+        parse_resolved: Optional[Callable[[Any], Any]] = None
+        # Every reference to the same name with the same constructor shares the outcomes
+        parser_id = (id(resolved), id(constructor))
+
+        def parse(target: Any) -> Any:
+            nonlocal parse_resolved
+            if parse_resolved is None:
+                parse_resolved = resolved.get_compiled()
+
+            outcomes = getattr(_PARSE_MEMO, "outcomes", None)
+            if outcomes is None:  # called outside of `parse_value`
+                result = parse_resolved(target)
+                return constructor(result) if has_constructor else result
+
+            key = (parser_id, id(target))
+            outcome = outcomes.get(key)
+            # The target is kept in the outcome, so that the identity is not reused by another object
+            if outcome is None or outcome[0] is not target:
+                try:
+                    result = parse_resolved(target)
+                except SyntaxPrasingError as err:
+                    outcomes[key] = (target, False, err)
+                    raise
+                outcome = outcomes[key] = (target, True, constructor(result) if has_constructor else result)
+
+            if not outcome[1]:
+                raise outcome[2]
+            return outcome[2]
+
+        return parse
 
 
 class Scope:
+    __slots__ = ("scope_name", "types_dict")
+
     def __init__(
         self,
         scope_name: str,
@@ -350,7 +996,18 @@ class Scope:
         parser_assembler: Callable[[Callable[[str], Parser]], dict[str, Parser]],
     ) -> None:
         self.scope_name = scope_name
-        self.types_dict = parser_assembler(lambda name: Scoped(self, name))
+        scoped_parsers: list[Scoped] = []
+
+        def scoped(name: str) -> Parser:
+            parser = Scoped(self, name)
+            scoped_parsers.append(parser)
+            return parser
+
+        self.types_dict = parser_assembler(scoped)
+
+        # All names are known once the scope is assembled, resolve them right away
+        for parser in scoped_parsers:
+            parser._resolve()
 
     def get_scoped_parser(self, name: str) -> Parser:
         if name not in self.types_dict:
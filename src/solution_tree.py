@@ -12,9 +12,9 @@ from typing import (
 )
 
 import json
-
 from pathlib import Path
-from functools import wraps
+from stat import S_ISREG
+from functools import cache, wraps
 
 from src.parser import (
     Parser,
@@ -33,26 +33,46 @@ from src.parser import (
 )
 
 
+json_loads: Callable[[Union[bytes, str]], Any]
+try:  # optional, a faster drop-in for reading the configurations
+    from orjson import loads as orjson_loads
+except ImportError:
+    json_loads = json.loads
+else:
+    json_loads = orjson_loads
+
+
+_MISSING = object()
+
+
 def cache_function(
-    func: Callable[[Any], Any], cache_dict: dict[str, Any], cache_key: str
+    func: Callable[[Any], Any], cache_dict: dict[tuple[str, int], Any], cache_key: str
 ) -> Callable[[Any], Any]:
+    """Caches the results of `func` by the identity of its argument.
+    Identities are only unique while the argument is alive, `cache_dict` is expected to be cleared between values.
+    """
     @wraps(func)
-    def wrapper(*args: Any, **kwargs: dict[str, Any]) -> Any:
-        if cache_key in cache_dict:
-            return cache_dict[cache_key]
-        return cache_dict.setdefault(cache_key, func(*args, **kwargs))
+    def wrapper(value: Any) -> Any:
+        key = (cache_key, id(value))
+        result = cache_dict.get(key, _MISSING)
+        if result is _MISSING:
+            result = cache_dict[key] = func(value)
+        return result
 
     return wrapper
 
 
 def check_json_path(json_config_path: Path) -> bool:
-    if not json_config_path.exists():
+    # A single stat call answers both whether the path exists and whether it is a file
+    try:
+        mode = json_config_path.stat().st_mode
+    except OSError:
         raise ValueError(f"Configuration does not exist on path {json_config_path}")
 
-    if not json_config_path.is_file():
+    if not S_ISREG(mode):
         raise ValueError(f"{json_config_path} expected to be a file")
 
-    if not json_config_path.match("*.json"):
+    if json_config_path.suffix != ".json":
         raise ValueError(f"{json_config_path} expected to be a JSON file")
 
     return True
@@ -62,8 +82,11 @@ Object_Type = TypeVar("Object_Type")
 Output_Type = TypeVar("Output_Type", bound=dict[str, Any])
 
 
-class Matcher(Protocol):
-    def match(self, value: Object_Type) -> bool: ...
+Matched_Type = TypeVar("Matched_Type", contravariant=True)
+
+
+class Matcher(Protocol[Matched_Type]):
+    def match(self, value: Matched_Type) -> bool: ...
 
     def __repr__(self) -> str:
         return "Matcher"
@@ -73,16 +96,29 @@ class Matcher(Protocol):
 T = TypeVar("T")
 
 
+def build_value_check(selector: Callable[[Object_Type], T], values: frozenset[T]) -> Callable[[Object_Type], bool]:
+    def match(value: Object_Type) -> bool:
+        return selector(value) in values
+
+    return match
+
+
 class ValueMatcher(Generic[T, Object_Type]):
+    __slots__ = ("_selector", "_values", "_is_negative", "match")
+
+    match: Callable[[Object_Type], bool]
+
     def __init__(
         self, selector: Callable[[Object_Type], T], values: Iterable[T]
     ) -> None:
         self._selector = selector
-        self._values = set(values)
+        # Frozen, so that intersections may share the values without copying
+        self._values = frozenset(values)
         self._is_negative = False
+        self.match = build_value_check(selector, self._values)
 
     def __eq__(self, other: object) -> bool:
-        return (
+        return other is self or (
             type(other) is ValueMatcher
             and self._is_negative == other._is_negative
             and self._values == other._values
@@ -95,14 +131,11 @@ class ValueMatcher(Generic[T, Object_Type]):
     def is_empty(self) -> bool:
         return len(self._values) == 0
 
-    def match(self, value: Object_Type) -> bool:
-        return self._selector(value) in self._values
-
     def intersect(self, other: Matcher) -> Optional[Matcher]:
         if type(other) is not ValueMatcher:
             return None
 
-        new_matcher = ValueMatcher(self._selector, list(self._values & other._values))
+        new_matcher = ValueMatcher(self._selector, self._values & other._values)
 
         if new_matcher.is_empty:
             return None
@@ -110,7 +143,41 @@ class ValueMatcher(Generic[T, Object_Type]):
         return cast(Matcher, new_matcher)
 
 
+# Lowered matchers are `(kind, first, second)` tuples:
+# - MATCH_VALUES checks `first(value) in second`,
+# - MATCH_EQUAL checks `first(value) == second`,
+# - MATCH_CALL checks `first(value)` for matchers of other types, `second` is unused.
+MATCH_VALUES, MATCH_EQUAL, MATCH_CALL = range(3)
+
+LoweredMatcher = tuple[int, Callable[[Any], Any], Any]
+
+
+def lower_matcher(matcher: Matcher) -> LoweredMatcher:
+    """Lowers a matcher to a tagged tuple, so that evaluating it does not go through the matcher classes."""
+    if type(matcher) is not ValueMatcher:
+        return (MATCH_CALL, matcher.match, None)
+
+    if len(matcher._values) == 1:
+        # A single value is compared directly, without hashing the selected value
+        (value,) = matcher._values
+        return (MATCH_EQUAL, matcher._selector, value)
+
+    return (MATCH_VALUES, matcher._selector, matcher._values)
+
+
+def build_check(lowered: LoweredMatcher) -> Callable[[Any], bool]:
+    """Builds the function evaluating a single lowered matcher."""
+    kind, first, second = lowered
+    if kind == MATCH_VALUES:
+        return lambda value: first(value) in second
+    if kind == MATCH_EQUAL:
+        return lambda value: first(value) == second
+    return first
+
+
 class Query(Generic[Object_Type]):
+    __slots__ = ("matchers", "selectors", "lowered", "_match", "_repr")
+
     def __init__(
         self,
         matchers: dict[str, Matcher],
@@ -118,8 +185,24 @@ class Query(Generic[Object_Type]):
     ) -> None:
         self.matchers = matchers
         self.selectors = selectors
+        # Matchers with fewer values go first, as they are the most likely to fail
+        self.lowered = tuple(
+            map(
+                lower_matcher,
+                sorted(
+                    matchers.values(),
+                    key=lambda matcher: len(matcher._values) if type(matcher) is ValueMatcher else float("inf"),
+                ),
+            )
+        )
+        # Intersections are only built to check reachability, the function is built on the first match
+        self._match: Optional[Callable[[Object_Type], bool]] = None
+        self._repr: Optional[str] = None
 
     def __eq__(self, other: object) -> bool:
+        if other is self:
+            return True
+
         if type(other) is not Query:
             return False
 
@@ -133,44 +216,84 @@ class Query(Generic[Object_Type]):
         return True
 
     def __repr__(self) -> str:
-        return f"Query {pformat(self.matchers)}"
-
-    def match(self, value: Object_Type) -> bool:
-        for matcher in self.matchers.values():
-            if not matcher.match(value):
-                return False
+        # Queries do not change after construction, the formatted matchers are kept for repeated messages
+        if self._repr is None:
+            self._repr = f"Query {pformat(self.matchers)}"
+        return self._repr
 
-        return True
+    @property
+    def match(self) -> Callable[[Object_Type], bool]:
+        """Checks that the value satisfies every matcher."""
+        if self._match is None:
+            self._match = self.compile_match()
+        return self._match
+
+    def compile_match(self) -> Callable[[Object_Type], bool]:
+        """Chains the checks of the lowered matchers, their kinds are resolved here once."""
+        checks = tuple(map(build_check, self.lowered))
+        if not checks:
+            return lambda _: True
+        if len(checks) == 1:
+            return checks[0]
+        if len(checks) == 2:
+            first, second = checks
+            return lambda value: first(value) and second(value)
+        if len(checks) == 3:
+            first, second, third = checks
+            return lambda value: first(value) and second(value) and third(value)
+        return lambda value: all(check(value) for check in checks)
 
     def intersect(self, other: "Query[Object_Type]") -> Optional["Query[Object_Type]"]:
-        matchers = {**self.matchers}
+        # Intersections are computed before copying anything, an empty one stops right away
+        merged: list[tuple[str, Matcher]] = []
         for key, matcher in other.matchers.items():
-            if key in matchers:
-                intersection = matchers[key].intersect(matcher)
-                if intersection is None:
-                    return None
+            own_matcher = self.matchers.get(key)
+            if own_matcher is None:
+                merged.append((key, matcher))
+                continue
 
-                matchers[key] = intersection
-            else:
-                matchers[key] = matcher
-        return Query(matchers, self.selectors)
+            intersection = own_matcher.intersect(matcher)
+            if intersection is None:
+                return None
+            merged.append((key, intersection))
+
+        return Query({**self.matchers, **dict(merged)}, self.selectors)
 
 
 class Setter(Generic[Output_Type]):
+    __slots__ = ("update_dict", "update")
+
+    update: Callable[[Output_Type], None]
+
     def __init__(self, update_dict: dict[str, Any]) -> None:
         self.update_dict = update_dict
+        self.update = self.compile_update()
 
     def __eq__(self, other: object) -> bool:
-        return type(other) is Setter and self.update_dict == other.update_dict
+        return other is self or type(other) is Setter and self.update_dict == other.update_dict
 
     def __repr__(self) -> str:
         return f"Setter[{self.update_dict}]"
 
-    def update(self, outer_dict: Output_Type) -> None:
-        outer_dict.update(self.update_dict)
+    def compile_update(self) -> Callable[[Output_Type], None]:
+        """Builds the function applying the setter, a single value is assigned without `dict.update`."""
+        if not self.update_dict:
+            return lambda _: None
+
+        if len(self.update_dict) == 1:
+            ((key, value),) = self.update_dict.items()
+            return lambda outer_dict: outer_dict.__setitem__(key, value)
+
+        update_dict = self.update_dict
+        return lambda outer_dict: outer_dict.update(update_dict)
 
 
 class Condition(Generic[Object_Type, Output_Type]):
+    __slots__ = ("query", "setter", "subconditions", "annotation", "match")
+
+    # Applies the condition if its query matches the value, built by `compile_match`
+    match: Callable[[Object_Type, Output_Type], bool]
+
     def __init__(
         self,
         query: Query[Object_Type],
@@ -187,26 +310,56 @@ class Condition(Generic[Object_Type, Output_Type]):
         self.setter = setter
         self.subconditions = subconditions
         self.annotation = annotation
+        self.match = self.compile_match()
 
     def __repr__(self) -> str:
         return f"Condition({self.annotation or ''}) [{self.query}, {self.setter}]"
 
-    def match(self, value: Object_Type, output: Output_Type) -> bool:
-        if self.query.match(value):
-            if self.setter is not None:
-                self.setter.update(output)
+    def compile_match(self) -> Callable[[Object_Type, Output_Type], bool]:
+        """Picks the variant of `match` doing only the steps present in this condition."""
+        match_query = self.query.match
 
-            if self.subconditions is not None:
-                self.subconditions.match(value, output)
+        if self.setter is None and self.subconditions is None:
+            return lambda value, _: match_query(value)
 
-            return True
+        if self.subconditions is None:
+            update = cast(Setter[Output_Type], self.setter).update
 
-        return False
+            def match_set(value: Object_Type, output: Output_Type) -> bool:
+                if match_query(value):
+                    update(output)
+                    return True
+                return False
+
+            return match_set
+
+        match_subconditions = self.subconditions.match
+        if self.setter is None:
+            def match_also(value: Object_Type, output: Output_Type) -> bool:
+                if match_query(value):
+                    match_subconditions(value, output)
+                    return True
+                return False
+
+            return match_also
+
+        update = self.setter.update
+
+        def match_set_also(value: Object_Type, output: Output_Type) -> bool:
+            if match_query(value):
+                update(output)
+                match_subconditions(value, output)
+                return True
+            return False
+
+        return match_set_also
 
 
 class SwitchApplyFirst(Generic[Object_Type, Output_Type]):
-    def __init__(self, conditions: list["Condition[Object_Type, Output_Type]"]) -> None:
-        self.conditions = conditions
+    __slots__ = ("conditions",)
+
+    def __init__(self, conditions: Iterable["Condition[Object_Type, Output_Type]"]) -> None:
+        self.conditions = tuple(conditions)
 
     def match(self, value: Object_Type, output: Output_Type) -> bool:
         for condition in self.conditions:
@@ -217,8 +370,10 @@ class SwitchApplyFirst(Generic[Object_Type, Output_Type]):
 
 
 class SwitchApplyAll(Generic[Object_Type, Output_Type]):
-    def __init__(self, conditions: list["Condition[Object_Type, Output_Type]"]) -> None:
-        self.conditions = conditions
+    __slots__ = ("conditions",)
+
+    def __init__(self, conditions: Iterable["Condition[Object_Type, Output_Type]"]) -> None:
+        self.conditions = tuple(conditions)
 
     def match(self, value: Object_Type, output: Output_Type) -> bool:
         result = False
@@ -229,6 +384,278 @@ class SwitchApplyAll(Generic[Object_Type, Output_Type]):
         return result
 
 
+# Instructions of a flattened tree are `(opcode, argument, jump target)` tuples:
+# - OP_QUERY calls `argument(value)` and continues at the jump target if it is false,
+# - OP_SET calls `argument(output)`,
+# - OP_JUMP continues at the jump target,
+# - OP_DISPATCH continues at the index returned by `argument(value)`.
+OP_QUERY, OP_SET, OP_JUMP, OP_DISPATCH = range(4)
+
+Instruction = tuple[int, Callable[[Any], Any], int]
+
+
+def jump_argument(_: Any) -> None:
+    """Argument of OP_JUMP instructions, it is never called."""
+
+
+def flatten_switch(
+    switch: Union["SwitchApplyFirst", "SwitchApplyAll"], instructions: Optional[list[Instruction]] = None
+) -> list[Instruction]:
+    """Emits the instructions evaluating `switch` in the same order as its `match` does."""
+    instructions = [] if instructions is None else instructions
+    is_apply_first = type(switch) is SwitchApplyFirst
+    end_jumps: list[int] = []
+    body_indices: list[int] = []
+
+    # "Apply first" keyed by a single selector looks the applied condition up by the selected value,
+    # otherwise a single check skips the whole switch when no condition can match
+    conditions = get_effective_conditions(switch)
+    dispatch_key = get_dispatch_key(conditions) if is_apply_first else None
+    guard = get_switch_guard(conditions) if dispatch_key is None else None
+    head_index = len(instructions)
+    if guard is not None or dispatch_key is not None:
+        instructions.append((OP_JUMP, jump_argument, -1))
+
+    for index, condition in enumerate(conditions):
+        # Queries without matchers always pass and need no instruction
+        query_index = len(instructions) if condition.query.matchers and dispatch_key is None else None
+        if query_index is not None:
+            instructions.append((OP_QUERY, condition.query.match, -1))
+
+        body_indices.append(len(instructions))
+
+        if condition.setter is not None and condition.setter.update_dict:
+            instructions.append((OP_SET, condition.setter.update, -1))
+
+        if condition.subconditions is not None:
+            flatten_switch(condition.subconditions, instructions)
+
+        # Once a condition of "apply first" is applied, the rest of the switch is skipped
+        if is_apply_first and index < len(conditions) - 1:
+            end_jumps.append(len(instructions))
+            instructions.append((OP_JUMP, jump_argument, -1))
+
+        if query_index is not None:
+            instructions[query_index] = (OP_QUERY, condition.query.match, len(instructions))
+
+    for index in end_jumps:
+        instructions[index] = (OP_JUMP, jump_argument, len(instructions))
+
+    if guard is not None:
+        instructions[head_index] = (OP_QUERY, guard.match, len(instructions))
+
+    if dispatch_key is not None:
+        instructions[head_index] = (
+            OP_DISPATCH,
+            build_dispatch(conditions, dispatch_key, body_indices, len(instructions)),
+            -1,
+        )
+
+    return instructions
+
+
+def get_selector_names(switch: Union["SwitchApplyFirst", "SwitchApplyAll"]) -> list[str]:
+    """Lists the selectors queried anywhere in the switch, in the order of their first use."""
+    names: dict[str, None] = {}
+    stack = list(reversed(switch.conditions))
+    while stack:
+        condition = stack.pop()
+        names.update(dict.fromkeys(condition.query.matchers))
+        if condition.subconditions is not None:
+            stack.extend(reversed(condition.subconditions.conditions))
+    return list(names)
+
+
+def get_effective_conditions(switch: Union["SwitchApplyFirst", "SwitchApplyAll"]) -> tuple["Condition", ...]:
+    """Leaves out the conditions which can never change the output:
+    any of them in "apply all", and the trailing ones in "apply first", where the others still stop the switch.
+    """
+    def is_effective(condition: Condition) -> bool:
+        return bool(
+            condition.setter is not None and condition.setter.update_dict
+            or condition.subconditions is not None and get_effective_conditions(condition.subconditions)
+        )
+
+    if type(switch) is SwitchApplyAll:
+        return tuple(filter(is_effective, switch.conditions))
+
+    conditions = list(switch.conditions)
+    while conditions and not is_effective(conditions[-1]):
+        conditions.pop()
+    return tuple(conditions)
+
+
+def get_dispatch_key(conditions: tuple["Condition", ...]) -> Optional[str]:
+    """Returns the selector name if every condition constrains only it, or nothing at all."""
+    keys = {key for condition in conditions for key in condition.query.matchers}
+    if len(keys) != 1:
+        return None
+
+    (key,) = keys
+    for condition in conditions:
+        matcher = condition.query.matchers.get(key)
+        if matcher is not None and type(matcher) is not ValueMatcher:
+            return None
+
+    return key
+
+
+def build_dispatch(
+    conditions: tuple["Condition", ...], key: str, body_indices: list[int], end_index: int
+) -> Callable[[Any], int]:
+    """Maps every selected value to the body of the first condition accepting it."""
+    table: dict[Any, int] = {}
+    default_index = end_index
+    selector: Optional[Callable[[Any], Any]] = None
+
+    for condition, body_index in zip(conditions, body_indices):
+        matcher = condition.query.matchers.get(key)
+        if matcher is None:
+            # Conditions without matchers accept any value, the ones after it are never applied
+            default_index = body_index
+            break
+
+        value_matcher = cast(ValueMatcher, matcher)
+        selector = value_matcher._selector
+        for value in value_matcher._values:
+            table.setdefault(value, body_index)
+
+    if selector is None:
+        return lambda _: default_index
+
+    select = selector
+    return lambda value: table.get(select(value), default_index)
+
+
+def get_switch_guard(conditions: tuple["Condition", ...]) -> Optional["Query"]:
+    """Builds a query which passes for every value that some of the conditions may match.
+    It constrains the selector required by all of the conditions with the fewest values in total.
+    """
+    if len(conditions) < 2:
+        return None
+
+    queries = [condition.query for condition in conditions]
+    guard: Optional[ValueMatcher] = None
+    for key in queries[0].matchers:
+        matchers = [query.matchers.get(key) for query in queries]
+        if any(type(matcher) is not ValueMatcher for matcher in matchers):
+            continue
+
+        value_matchers = cast(list[ValueMatcher], matchers)
+        values = frozenset().union(*(matcher._values for matcher in value_matchers))
+        if guard is None or len(values) < len(guard._values):
+            guard = ValueMatcher(value_matchers[0]._selector, values)
+
+    return None if guard is None else Query({"guard": guard}, queries[0].selectors)
+
+
+WHEN_CLAUSE = "when"
+ALSO_CLAUSE = "also"
+SET_CLAUSE = "set"
+ANNOTATION_CLAUSE = "_annotation"
+
+SWICTH_FIRST_MATCH = "apply first"
+SWICTH_ALL_MATCH = "apply all"
+
+
+@cache
+def get_config_parser() -> Parser:
+    """Parser splitting a configuration into its schema and tree, built once and shared by all trees."""
+    return (
+        Scope(
+            "Full",
+            parser_assembler=lambda scoped: {
+                "Schema": DictExp(
+                    {
+                        "selectors": Type(dict),
+                        "output": Type(dict),
+                    }
+                ),
+                "root": UnionExp(
+                    DictExp(
+                        {
+                            "schema": scoped("Schema"),
+                            SWICTH_FIRST_MATCH: Type(list),
+                        },
+                        lambda d: (
+                            d["schema"],
+                            {SWICTH_FIRST_MATCH: d[SWICTH_FIRST_MATCH]},
+                        ),
+                    ),
+                    DictExp(
+                        {
+                            "schema": scoped("Schema"),
+                            SWICTH_ALL_MATCH: Type(list),
+                        },
+                        lambda d: (
+                            d["schema"],
+                            {SWICTH_ALL_MATCH: d[SWICTH_ALL_MATCH]},
+                        ),
+                    ),
+                ),
+            },
+        )
+        .get_scoped_parser("root")
+    )
+
+
+@cache
+def get_schema_parser() -> Parser:
+    """Parser turning the schema of a configuration into parsers of its selectors and outputs."""
+    return (
+        Scope(
+            "Schema",
+            parser_assembler=lambda scoped: {
+                "bool_type": Const("bool", constructor=lambda _: Type(bool)),
+                "str_type": Const("str", constructor=lambda _: Type(str)),
+                "number_type": Const(
+                    "number", constructor=lambda _: UnionExp(Type(int), Type(float))
+                ),
+                "enum": ListOf(
+                    UnionExp(
+                        Const(None), Type(str), Type(int), Type(float), Type(bool)
+                    ),
+                    constructor=lambda values: Enumerated(values=values),
+                ),
+                "array": DictExp(
+                    {
+                        "list of": UnionExp(
+                            scoped("bool_type"),
+                            scoped("str_type"),
+                            scoped("number_type"),
+                            scoped("enum"),
+                        )
+                    },
+                    constructor=lambda d: ListOf(d["list of"]),
+                ),
+                "root": DictExp(
+                    {
+                        "selectors": DictOf(
+                            UnionExp(
+                                scoped("bool_type"),
+                                scoped("str_type"),
+                                scoped("number_type"),
+                                scoped("enum"),
+                            )
+                        ),
+                        "output": DictOf(
+                            UnionExp(
+                                scoped("bool_type"),
+                                scoped("str_type"),
+                                scoped("number_type"),
+                                scoped("enum"),
+                                scoped("array"),
+                            )
+                        ),
+                    },
+                    lambda d: (d["selectors"], d["output"]),
+                ),
+            },
+        )
+        .get_scoped_parser("root")
+    )
+
+
 class ReachabilityException(ValueError): ...
 
 class SetterFullnessException(ValueError): ...
@@ -239,156 +666,145 @@ class SolutionTree(Generic[Object_Type, Output_Type]):
         self,
         json_config: dict[str, Any],
         selectors: dict[str, Callable[[Object_Type], Any]],
-        test_schema=False,
+        test_schema: bool = False,  # accepted for compatibility, the configuration is always checked
     ) -> None:
-        self.selectors_cache: dict[str, Any] = {}
+        self.selectors_cache: dict[tuple[str, int], Any] = {}
         self.selectors = {
             key: cache_function(selector, self.selectors_cache, key)
             for key, selector in selectors.items()
         }
-        self.tree = self.parse(json_config, self.selectors, test_schema)
+        self.tree = self.parse(json_config, self.selectors)
+        self.instructions = tuple(flatten_switch(self.tree))
+        self.selector_names = tuple(get_selector_names(self.tree))
 
     def match_update(self, value: Object_Type) -> Output_Type:
-        result = cast(Output_Type, {})
-        self.tree.match(value, result)
-        return result
+        return self.match_update_into(value, cast(Output_Type, {}))
+
+    def match_update_into(self, value: Object_Type, output: Output_Type) -> Output_Type:
+        """Clears `output` and fills it with the values set for `value`, allowing to reuse a single dict."""
+        output.clear()
+        self.selectors_cache.clear()
+        self._run(value, output)
+        return output
+
+    def match_update_many(self, values: Iterable[Object_Type]) -> list[Output_Type]:
+        # Matching is done into a single scratch dict, copied once it is complete
+        scratch = cast(Output_Type, {})
+        results: list[Output_Type] = []
+        for value in values:
+            scratch.clear()
+            self.selectors_cache.clear()
+            self._run(value, scratch)
+            results.append(cast(Output_Type, scratch.copy()))
+        return results
+
+    def match_update_batch(self, values: Iterable[Object_Type]) -> list[Output_Type]:
+        """Same as `match_update_many`, but the tree is evaluated once per distinct selection of values.
+        Unlike the other methods, every selector used by the tree is called for each value.
+        """
+        selectors = [self.selectors[name] for name in self.selector_names]
+        outputs_by_selection: dict[tuple[Any, ...], Output_Type] = {}
+        results: list[Output_Type] = []
+        for value in values:
+            # Selections are cached, so the tree evaluation below does not select them again
+            self.selectors_cache.clear()
+            selection: Optional[tuple[Any, ...]] = tuple(selector(value) for selector in selectors)
+            try:
+                output = outputs_by_selection.get(cast(tuple[Any, ...], selection))
+            except TypeError:  # unhashable selected values are matched one by one
+                selection, output = None, None
+
+            if output is None:
+                output = cast(Output_Type, {})
+                self._run(value, output)
+                if selection is not None:
+                    outputs_by_selection[selection] = output
+
+            results.append(cast(Output_Type, output.copy()))
+        return results
+
+    def _run(self, value: Object_Type, output: Output_Type) -> None:
+        """Evaluates the flattened tree, equivalent to `self.tree.match(value, output)`."""
+        instructions = self.instructions
+        index, end = 0, len(instructions)
+        while index < end:
+            opcode, argument, jump = instructions[index]
+            if opcode == OP_QUERY:
+                index = index + 1 if argument(value) else jump
+            elif opcode == OP_SET:
+                argument(output)
+                index += 1
+            elif opcode == OP_DISPATCH:
+                index = argument(value)
+            else:
+                index = jump
 
     @staticmethod
     def from_file(
         json_config_path: Path, selectors: dict[str, Callable[[Object_Type], Any]]
     ) -> "SolutionTree[Object_Type, Output_Type]":
         check_json_path(json_config_path)
-        return SolutionTree(json.load(json_config_path.open()), selectors)
+        with json_config_path.open("rb") as json_file:
+            json_config = json_loads(json_file.read())
+        return SolutionTree(json_config, selectors)
 
     def check_reachability(self):
         for condition in self.tree.conditions:
             self.check_condition_reachability(condition)
 
     def check_condition_reachability(self, condition: Condition, prev_query: Optional[Query] = None, prev_setter_values: Optional[set[str]] = None):
-        query_intersection = prev_query.intersect(condition.query) if prev_query else condition.query
-
-        setter_values = prev_setter_values
-        if condition.setter:
-            setter_values = set(condition.setter.update_dict.keys())
-            setter_values = prev_setter_values & setter_values if prev_setter_values is not None else setter_values
-
-        if query_intersection is None:
-            raise ReachabilityException(f"{condition} does is not reachable.")
-
-        if condition.subconditions:
-            for inner_condition in condition.subconditions.conditions:
-                self.check_condition_reachability(inner_condition, query_intersection, setter_values)
+        # Nested conditions are visited depth-first with an explicit stack, deep configurations do not recurse
+        stack: list[tuple[Condition, Optional[Query], Optional[set[str]]]] = [(condition, prev_query, prev_setter_values)]
+        while stack:
+            condition, prev_query, prev_setter_values = stack.pop()
+            query_intersection = prev_query.intersect(condition.query) if prev_query else condition.query
+
+            setter_values = prev_setter_values
+            if condition.setter:
+                setter_values = set(condition.setter.update_dict.keys())
+                setter_values = prev_setter_values & setter_values if prev_setter_values is not None else setter_values
+
+            if query_intersection is None:
+                raise ReachabilityException(f"{condition} does is not reachable.")
+
+            if condition.subconditions:
+                stack.extend(
+                    (inner_condition, query_intersection, setter_values)
+                    for inner_condition in reversed(condition.subconditions.conditions)
+                )
 
     def parse(
         self,
         json_config: dict[str, Any],
         selectors: dict[str, Callable[[Object_Type], Any]],
-        parse_blindly=False,
     ) -> Union[SwitchApplyFirst, SwitchApplyAll]:
-        WHEN_CLAUSE = "when"
-        ALSO_CLAUSE = "also"
-        SET_CLAUSE = "set"
-        ANNOTATION_CLAUSE = "_annotation"
-
-        SWICTH_FIRST_MATCH = "apply first"
-        SWICTH_ALL_MATCH = "apply all"
-
-        schema, tree = (
-            Scope(
-                "Full",
-                parser_assembler=lambda scoped: {
-                    "Schema": DictExp(
-                        {
-                            "selectors": Type(dict),
-                            "output": Type(dict),
-                        }
-                    ),
-                    "root": UnionExp(
-                        DictExp(
-                            {
-                                "schema": scoped("Schema"),
-                                SWICTH_FIRST_MATCH: Type(list),
-                            },
-                            lambda d: (
-                                d["schema"],
-                                {SWICTH_FIRST_MATCH: d[SWICTH_FIRST_MATCH]},
-                            ),
-                        ),
-                        DictExp(
-                            {
-                                "schema": scoped("Schema"),
-                                SWICTH_ALL_MATCH: Type(list),
-                            },
-                            lambda d: (
-                                d["schema"],
-                                {SWICTH_ALL_MATCH: d[SWICTH_ALL_MATCH]},
-                            ),
-                        ),
-                    ),
-                },
-            )
-            .get_scoped_parser("root")
-            .parse_value(json_config, parse_blindly)
-        )
-
-        selectors_schema, output_schema = (
-            Scope(
-                "Schema",
-                parser_assembler=lambda scoped: {
-                    "bool_type": Const("bool", constructor=lambda _: Type(bool)),
-                    "str_type": Const("str", constructor=lambda _: Type(str)),
-                    "number_type": Const(
-                        "number", constructor=lambda _: UnionExp(Type(int), Type(float))
-                    ),
-                    "enum": ListOf(
-                        UnionExp(
-                            Const(None), Type(str), Type(int), Type(float), Type(bool)
-                        ),
-                        constructor=lambda values: Enumerated(values=values),
-                    ),
-                    "array": DictExp(
-                        {
-                            "list of": UnionExp(
-                                scoped("bool_type"),
-                                scoped("str_type"),
-                                scoped("number_type"),
-                                scoped("enum"),
-                            )
-                        },
-                        constructor=lambda d: ListOf(d["list of"]),
-                    ),
-                    "root": DictExp(
-                        {
-                            "selectors": DictOf(
-                                UnionExp(
-                                    scoped("bool_type"),
-                                    scoped("str_type"),
-                                    scoped("number_type"),
-                                    scoped("enum"),
-                                )
-                            ),
-                            "output": DictOf(
-                                UnionExp(
-                                    scoped("bool_type"),
-                                    scoped("str_type"),
-                                    scoped("number_type"),
-                                    scoped("enum"),
-                                    scoped("array"),
-                                )
-                            ),
-                        },
-                        lambda d: (d["selectors"], d["output"]),
-                    ),
-                },
-            )
-            .get_scoped_parser("root")
-            .parse_value(schema, parse_blindly)
-        )
+        schema, tree = get_config_parser().parse_value(json_config)
+        selectors_schema, output_schema = get_schema_parser().parse_value(schema)
 
         for selector_name in selectors_schema:
             if selector_name not in selectors:
                 raise ValueError(f'"{selector_name}" is required by the schema.')
 
+        # Repeated clauses share a single matcher or setter, values are paired with their types
+        # to keep values such as 1 and True apart
+        value_matchers: dict[tuple[str, frozenset[tuple[type, Any]]], ValueMatcher] = {}
+        setters: dict[tuple[tuple[str, type, Any], ...], Setter] = {}
+
+        def value_matcher(name: str, values: list[Any]) -> ValueMatcher:
+            key = (name, frozenset((type(value), value) for value in values))
+            if key not in value_matchers:
+                value_matchers[key] = ValueMatcher(selectors[name], values)
+            return value_matchers[key]
+
+        def setter(update_dict: dict[str, Any]) -> Setter:
+            key = tuple(
+                (name, type(value), tuple((type(item), item) for item in value) if type(value) is list else value)
+                for name, value in update_dict.items()
+            )
+            if key not in setters:
+                setters[key] = Setter(update_dict)
+            return setters[key]
+
         solution_tree_scope = Scope(
             "SolutionTree",
             parser_assembler=lambda scoped: {
@@ -408,16 +824,14 @@ class SolutionTree(Generic[Object_Type, Output_Type]):
                                     _type,  # Turns out Python does not create scope for anonymous functions
                                     cast(
                                         Callable[[Any], ValueMatcher],
-                                        lambda x, s=selectors[name]: ValueMatcher(
-                                            s, [x]
-                                        ),
+                                        lambda x, name=name: value_matcher(name, [x]),
                                     ),
                                 ),
                                 ListOf(
                                     _type,
                                     cast(
                                         Callable[[list[Any]], ValueMatcher],
-                                        lambda x, s=selectors[name]: ValueMatcher(s, x),
+                                        lambda x, name=name: value_matcher(name, x),
                                     ),
                                 ),
                             )
@@ -431,7 +845,7 @@ class SolutionTree(Generic[Object_Type, Output_Type]):
                         output_name: Opt(output_type)
                         for output_name, output_type in output_schema.items()
                     },
-                    lambda update_dict: Setter(update_dict),
+                    setter,
                 ),
                 "Condition": DictExp(
                     {
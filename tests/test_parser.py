@@ -1,7 +1,10 @@
 from dataclasses import dataclass
+import gc
+import pickle
 import re
-from typing import Any, NamedTuple, Optional
+from typing import Any, Callable, NamedTuple, Optional
 import pytest
+import weakref
 
 from src.parser import (
     Const,
@@ -19,28 +22,30 @@ from src.parser import (
 )
 
 
+@dataclass(frozen=True, slots=True)
 class Box:
-    def __init__(self, data: Any) -> None:
-        self.data = data
-
-    def __eq__(self, value: object) -> bool:
-        return type(value) is Box and self.data == value.data
+    data: Any
 
 
+@dataclass(frozen=True, slots=True)
 class BoxA:
-    def __init__(self, data: Any) -> None:
-        self.data = data
-
-    def __eq__(self, value: object) -> bool:
-        return type(value) is BoxA and self.data == value.data
+    data: Any
 
 
+@dataclass(frozen=True, slots=True)
 class BoxB:
-    def __init__(self, data: Any) -> None:
-        self.data = data
+    data: Any
+
 
-    def __eq__(self, value: object) -> bool:
-        return type(value) is BoxB and self.data == value.data
+# Parsers do not change once built, rows share the common ones instead of building their own
+INT = Type(int)
+BOX_INT = Type(int, Box)
+STR = Type(str)
+FLOAT = Type(float)
+LIST = Type(list)
+NONE = Const(None)
+LIST_INT = ListOf(INT)
+OPT_INT = UnionExp(NONE, INT)
 
 
 @pytest.mark.parametrize(
@@ -48,17 +53,17 @@ class BoxB:
     [
         pytest.param(
             [1, 2, 3],
-            Type(list),
+            LIST,
             [1, 2, 3],
         ),
         pytest.param(
             1,
-            Type(int),
+            INT,
             1,
         ),
         pytest.param(
             1,
-            Type(int, Box),
+            BOX_INT,
             Box(1),
         ),
     ],
@@ -72,12 +77,12 @@ def test_type_expression_parser(value: Any, parser: Parser, expected: Any) -> No
     [
         pytest.param(
             [1, 2, 3],
-            Identity(Type(list), Box),
+            Identity(LIST, Box),
             Box([1, 2, 3]),
         ),
         pytest.param(
             1,
-            Identity(Identity(Type(int), Box), Box),
+            Identity(Identity(INT, Box), Box),
             Box(Box(1)),
         ),
     ],
@@ -88,6 +93,14 @@ def test_identity_type_expression_parser(
     assert parser.parse_value(value) == expected
 
 
+def test_identity_type_expression_parser_flattens_nesting() -> None:
+    inner = Type(int)
+    parser = Identity(Identity(Identity(inner), BoxA), BoxB)
+
+    assert parser.matcher is inner
+    assert parser.parse_value(1) == BoxB(BoxA(1))
+
+
 @pytest.mark.parametrize(
     ["value", "parser"],
     [
@@ -97,20 +110,36 @@ def test_identity_type_expression_parser(
         ),
         pytest.param(
             1,
-            Type(str),
+            STR,
         ),
         pytest.param(
             1,
-            Type(float),
+            FLOAT,
         ),
         pytest.param(
             "1",
-            Type(int),
+            INT,
         ),
         pytest.param(
             0,
             Type(bool),
         ),
+        pytest.param(
+            True,
+            INT,
+        ),
+        pytest.param(
+            True,
+            BOX_INT,
+        ),
+        pytest.param(
+            1,
+            Type(bool, Box),
+        ),
+        pytest.param(
+            1.0,
+            INT,
+        ),
         pytest.param(
             1,
             Type(str, Box),
@@ -129,32 +158,32 @@ def test_type_expression_parser_fails(value: Any, parser: Parser) -> None:
     [
         pytest.param(
             [1, 2, 3],
-            UnionExp(Const(None), Type(list)),
+            UnionExp(NONE, LIST),
             [1, 2, 3],
         ),
         pytest.param(
             1,
-            UnionExp(Const(None), Type(int)),
+            OPT_INT,
             1,
         ),
         pytest.param(
             1,
-            UnionExp(Const(None), Type(int, Box)),
+            UnionExp(NONE, BOX_INT),
             Box(1),
         ),
         pytest.param(
             None,
-            UnionExp(Const(None), Type(list)),
+            UnionExp(NONE, LIST),
             None,
         ),
         pytest.param(
             None,
-            UnionExp(Const(None), Type(int)),
+            OPT_INT,
             None,
         ),
         pytest.param(
             None,
-            UnionExp(Const(None), Type(int, Box)),
+            UnionExp(NONE, BOX_INT),
             None,
         ),
     ],
@@ -170,27 +199,27 @@ def test_optional_type_expression_parser(
     [
         pytest.param(
             [1, 2, 3],
-            UnionExp(Const(None), Type(dict)),
+            UnionExp(NONE, Type(dict)),
         ),
         pytest.param(
             1,
-            UnionExp(Const(None), Type(str)),
+            UnionExp(NONE, STR),
         ),
         pytest.param(
             1,
-            UnionExp(Const(None), Type(float)),
+            UnionExp(NONE, FLOAT),
         ),
         pytest.param(
             "1",
-            UnionExp(Const(None), Type(int)),
+            OPT_INT,
         ),
         pytest.param(
             0,
-            UnionExp(Const(None), Type(bool)),
+            UnionExp(NONE, Type(bool)),
         ),
         pytest.param(
             1,
-            UnionExp(Const(None), Type(str, Box)),
+            UnionExp(NONE, Type(str, Box)),
         ),
     ],
 )
@@ -204,44 +233,59 @@ def test_optional_type_expression_parser_fails(value: Any, parser: Parser) -> No
     [
         pytest.param(
             [1, 2, 3],
-            ListOf(Type(int)),
+            LIST_INT,
             [1, 2, 3],
         ),
         pytest.param(
             [1],
-            ListOf(Type(int), Box),
+            ListOf(INT, Box),
             Box([1]),
         ),
         pytest.param(
             [1],
-            ListOf(Type(int, Box)),
+            ListOf(BOX_INT),
             [Box(1)],
         ),
         pytest.param(
             [1],
-            ListOf(Type(int, Box), Box),
+            ListOf(BOX_INT, Box),
             Box([Box(1)]),
         ),
         pytest.param(
             [None],
-            ListOf(UnionExp(Const(None), Type(int))),
+            ListOf(OPT_INT),
             [None],
         ),
         pytest.param(
             [None, 2, 3, None],
-            ListOf(UnionExp(Const(None), Type(int))),
+            ListOf(OPT_INT),
             [None, 2, 3, None],
         ),
         pytest.param(
             [None, 2, 3, None],
-            ListOf(UnionExp(Const(None), Type(int, Box))),
+            ListOf(UnionExp(NONE, BOX_INT)),
             [None, Box(2), Box(3), None],
         ),
         pytest.param(
             None,
-            UnionExp(Const(None), ListOf(Type(int))),
+            UnionExp(NONE, LIST_INT),
             None,
         ),
+        pytest.param(
+            [1.0, 2.5, 3.0],
+            ListOf(FLOAT, Box),
+            Box([1.0, 2.5, 3.0]),
+        ),
+        pytest.param(
+            ["a", "b"],
+            ListOf(STR),
+            ["a", "b"],
+        ),
+        pytest.param(
+            [True, False],
+            ListOf(Type(bool)),
+            [True, False],
+        ),
     ],
 )
 def test_list_of_type_expression_parser(
@@ -255,27 +299,43 @@ def test_list_of_type_expression_parser(
     [
         pytest.param(
             [1, 2, 3],
-            ListOf(Type(str)),
+            ListOf(STR),
         ),
         pytest.param(
             [1],
-            ListOf(Type(float), Box),
+            ListOf(FLOAT, Box),
         ),
         pytest.param(
             ["1", "2"],
-            ListOf(Type(int, Box)),
+            ListOf(BOX_INT),
         ),
         pytest.param(
             [1, "2", 3],
-            ListOf(Type(int, Box), Box),
+            ListOf(BOX_INT, Box),
         ),
         pytest.param(
             [None],
-            ListOf(Type(int)),
+            LIST_INT,
         ),
         pytest.param(
             None,
-            ListOf(Type(int)),
+            LIST_INT,
+        ),
+        pytest.param(
+            [1.0, 2, 3.0],
+            ListOf(FLOAT),
+        ),
+        pytest.param(
+            [1, True, 3],
+            LIST_INT,
+        ),
+        pytest.param(
+            [True, False],
+            LIST_INT,
+        ),
+        pytest.param(
+            [True, 0],
+            ListOf(Type(bool)),
         ),
     ],
 )
@@ -289,27 +349,27 @@ def test_list_of_type_expression_parser_fails(value: Any, parser: Parser) -> Non
     [
         pytest.param(
             [1, 2, 3],
-            ListOf(Type(str)),
+            ListOf(STR),
         ),
         pytest.param(
             [1],
-            ListOf(Type(float), Box),
+            ListOf(FLOAT, Box),
         ),
         pytest.param(
             ["1", "2"],
-            ListOf(Type(int, Box)),
+            ListOf(BOX_INT),
         ),
         pytest.param(
             [1, "2", 3],
-            ListOf(Type(int, Box), Box),
+            ListOf(BOX_INT, Box),
         ),
         pytest.param(
             [None],
-            ListOf(Type(int)),
+            LIST_INT,
         ),
         pytest.param(
             None,
-            ListOf(Type(int)),
+            LIST_INT,
         ),
     ],
 )
@@ -319,72 +379,101 @@ def test_enum_type_expression_parser_fails(value: Any, parser: Parser) -> None:
 
 
 @pytest.mark.parametrize(
-    ["value", "parser", "expected"],
+    ["value", "parser_factory", "expected"],
     [
         pytest.param(
             {"a": 1, "b": 2, "c": 3},
-            DictOf(Type(int)),
+            lambda: DictOf(INT),
             {"a": 1, "b": 2, "c": 3},
+            id="ints",
         ),
         pytest.param(
             {"a": 1},
-            DictOf(Type(int), Box),
+            lambda: DictOf(INT, Box),
             Box({"a": 1}),
+            id="constructor",
         ),
         pytest.param(
             {"a": 1},
-            DictOf(Type(int, Box)),
+            lambda: DictOf(BOX_INT),
             {"a": Box(1)},
+            id="item constructor",
         ),
         pytest.param(
             {"a": 1},
-            DictOf(Type(int, Box), Box),
+            lambda: DictOf(BOX_INT, Box),
             Box({"a": Box(1)}),
+            id="item and dict constructors",
         ),
         pytest.param(
             {"a": None},
-            DictOf(UnionExp(Const(None), Type(int))),
+            lambda: DictOf(OPT_INT),
             {"a": None},
+            id="null item",
         ),
         pytest.param(
             {},
-            DictOf(Type(int)),
+            lambda: DictOf(INT),
             {},
+            id="empty",
         ),
         pytest.param(
             {"a": None, "b": 2, "c": 3, "d": None},
-            DictOf(UnionExp(Const(None), Type(int))),
+            lambda: DictOf(OPT_INT),
             {"a": None, "b": 2, "c": 3, "d": None},
+            id="optional items",
         ),
         pytest.param(
             {"a": None, "b": 2, "c": 3, "d": None},
-            DictOf(UnionExp(Const(None), Type(int, Box))),
+            lambda: DictOf(UnionExp(NONE, BOX_INT)),
             {"a": None, "b": Box(2), "c": Box(3), "d": None},
+            id="union items",
         ),
         pytest.param(
             {"a": None, "b": 2, "c": 3, "d": None},
-            DictOf(
-                UnionExp(Const(None), Type(int)),
+            lambda: DictOf(
+                OPT_INT,
                 key_is_allowed=lambda key: len(key) == 1,
             ),
             {"a": None, "b": 2, "c": 3, "d": None},
+            id="key predicate",
         ),
         pytest.param(
             {"a": {"b": "2", "c": "3"}},
-            DictOf(DictOf(Type(str, Box))),
+            lambda: DictOf(DictOf(Type(str, Box))),
             {"a": {"b": Box("2"), "c": Box("3")}},
+            id="nested",
         ),
         pytest.param(
             None,
-            UnionExp(Const(None), DictOf(Type(int))),
+            lambda: UnionExp(NONE, DictOf(INT)),
             None,
+            id="null union",
+        ),
+        pytest.param(
+            {"a": 1.0, "b": 2.5},
+            lambda: DictOf(FLOAT),
+            {"a": 1.0, "b": 2.5},
+            id="floats",
+        ),
+        pytest.param(
+            {"a": 1, "b": 2},
+            lambda: DictOf(INT, key_is_allowed=lambda key: key in {"a", "b"}),
+            {"a": 1, "b": 2},
+            id="key set predicate",
+        ),
+        pytest.param(
+            {"a": 1, "b": 2},
+            lambda: DictOf(INT, allowed_keys={"a", "b", "c"}),
+            {"a": 1, "b": 2},
+            id="allowed keys collection",
         ),
     ],
 )
 def test_dict_of_type_expression_parser(
-    value: Any, parser: Parser, expected: Any
+    value: Any, parser_factory: Callable[[], Parser], expected: Any
 ) -> None:
-    assert parser.parse_value(value) == expected
+    assert parser_factory().parse_value(value) == expected
 
 
 @pytest.mark.parametrize(
@@ -392,39 +481,39 @@ def test_dict_of_type_expression_parser(
     [
         pytest.param(
             [1, 2, 3],
-            DictOf(Type(str)),
+            DictOf(STR),
         ),
         pytest.param(
             [1],
-            DictOf(Type(float), Box),
+            DictOf(FLOAT, Box),
         ),
         pytest.param(
             ["1", "2"],
-            DictOf(Type(int, Box)),
+            DictOf(BOX_INT),
         ),
         pytest.param(
             [1, "2", 3],
-            DictOf(Type(int, Box), Box),
+            DictOf(BOX_INT, Box),
         ),
         pytest.param(
             [None],
-            DictOf(Type(int)),
+            DictOf(INT),
         ),
         pytest.param(
             None,
-            DictOf(Type(int)),
+            DictOf(INT),
         ),
         pytest.param(
             {"a": 1, "b": "2", "c": 3},
-            DictOf(Type(int)),
+            DictOf(INT),
         ),
         pytest.param(
             {"a": "1"},
-            DictOf(Type(int), Box),
+            DictOf(INT, Box),
         ),
         pytest.param(
             {"a": "1"},
-            DictOf(Type(int, Box)),
+            DictOf(BOX_INT),
         ),
         pytest.param(
             {"a": 1},
@@ -436,26 +525,42 @@ def test_dict_of_type_expression_parser(
         ),
         pytest.param(
             {"a": None, "b": 2, "c": 3, "d": None},
-            DictOf(UnionExp(Const(None), Type(str))),
+            DictOf(UnionExp(NONE, STR)),
         ),
         pytest.param(
             {"a": None, "b": [1, 2], "c": [3]},
-            DictOf(UnionExp(Const(None), ListOf(Type(str)))),
+            DictOf(UnionExp(NONE, ListOf(STR))),
         ),
         pytest.param(
             {"a": None, "b": 2, "c": 3, "d": None},
             DictOf(
-                UnionExp(Const(None), Type(int)),
+                OPT_INT,
                 key_is_allowed=lambda key: len(key) == 2,
             ),
         ),
         pytest.param(
             {"a": None, "b": 2, "c": 3, "d": None},
             DictOf(
-                UnionExp(Const(None), Type(int)),
+                OPT_INT,
                 key_is_allowed=lambda key: key in {"a", "b", "c"},
             ),
         ),
+        pytest.param(
+            {"a": 1, "b": True},
+            DictOf(INT),
+        ),
+        pytest.param(
+            {"a": 1.0, "b": 2},
+            DictOf(FLOAT),
+        ),
+        pytest.param(
+            {"a": 1, "bb": 2},
+            DictOf(INT, key_is_allowed=lambda key: len(key) == 1),
+        ),
+        pytest.param(
+            {"a": 1, "d": 2},
+            DictOf(INT, allowed_keys=("a", "b", "c")),
+        ),
     ],
 )
 def test_dict_of_type_expression_parser_fails(value: Any, parser: Parser) -> None:
@@ -463,57 +568,64 @@ def test_dict_of_type_expression_parser_fails(value: Any, parser: Parser) -> Non
         parser.parse_value(value)
 
 
+def test_dict_of_type_expression_parser_allowed_keys() -> None:
+    assert DictOf(INT).key_is_allowed("any key")
+
+    with pytest.raises(TypeError):
+        DictOf(INT, allowed_keys="abc")
+
+
 @pytest.mark.parametrize(
     ["value", "parser", "expected"],
     [
         pytest.param(
             [1, 2, 3],
-            UnionExp(Type(list), Type(int)),
+            UnionExp(LIST, INT),
             [1, 2, 3],
         ),
         pytest.param(
             2,
-            UnionExp(Type(list), Type(int)),
+            UnionExp(LIST, INT),
             2,
         ),
         pytest.param(
             [1, 2, 3],
-            UnionExp(Type(list, Box), Type(int)),
+            UnionExp(Type(list, Box), INT),
             Box([1, 2, 3]),
         ),
         pytest.param(
             2,
-            UnionExp(Type(list), Type(int, Box)),
+            UnionExp(LIST, BOX_INT),
             Box(2),
         ),
         pytest.param(
             [1, 2, 3],
-            UnionExp(Type(list), Type(int, Box)),
+            UnionExp(LIST, BOX_INT),
             [1, 2, 3],
         ),
         pytest.param(
             2,
-            UnionExp(Type(list, Box), Type(int)),
+            UnionExp(Type(list, Box), INT),
             2,
         ),
         pytest.param(
             [1, 2, 3],
-            UnionExp(ListOf(Type(int, Box)), Type(int, Box)),
+            UnionExp(ListOf(BOX_INT), BOX_INT),
             [Box(1), Box(2), Box(3)],
         ),
         pytest.param(
             1,
-            UnionExp(Type(int)),
+            UnionExp(INT),
             1,
         ),
         pytest.param(
             1,
-            UnionExp(Type(int, Box)),
+            UnionExp(BOX_INT),
             Box(1),
         ),
         pytest.param(
             {"b": 2, "c": "3", "d": [1, 2, 3]},
-            DictOf(UnionExp(Type(int), Type(str), ListOf(Type(int)))),
+            DictOf(UnionExp(INT, STR, LIST_INT)),
             {"b": 2, "c": "3", "d": [1, 2, 3]},
         ),
         pytest.param(
@@ -521,6 +633,26 @@ def test_dict_of_type_expression_parser_fails(value: Any, parser: Parser) -> Non
             ListOf(UnionExp(Type(int, BoxA), Type(str, BoxB))),
             [BoxA(1), BoxB("2"), BoxA(3)],
         ),
+        pytest.param(
+            ["1", "2"],
+            UnionExp(ListOf(Type(int, BoxA)), ListOf(Type(str, BoxB))),
+            [BoxB("1"), BoxB("2")],
+        ),
+        pytest.param(
+            None,
+            UnionExp(LIST_INT, Const(None, Box), INT),
+            Box(None),
+        ),
+        pytest.param(
+            True,
+            UnionExp(Type(int, BoxA), Const(1, BoxB)),
+            BoxB(True),
+        ),
+        pytest.param(
+            [True, 1, False],
+            ListOf(UnionExp(Type(int, BoxA), Type(bool, BoxB))),
+            [BoxB(True), BoxA(1), BoxB(False)],
+        ),
     ],
 )
 def test_union_type_expression_parser(
@@ -534,32 +666,40 @@ def test_union_type_expression_parser(
     [
         pytest.param(
             [1, "2", 3],
-            UnionExp(ListOf(Type(int)), Type(int)),
+            UnionExp(LIST_INT, INT),
         ),
         pytest.param(
             "2",
-            UnionExp(ListOf(Type(int)), Type(int)),
+            UnionExp(LIST_INT, INT),
         ),
         pytest.param(
             2.0,
-            UnionExp(Type(list), Type(int, Box)),
+            UnionExp(LIST, BOX_INT),
         ),
         pytest.param(
             "1",
-            UnionExp(Type(int)),
+            UnionExp(INT),
         ),
         pytest.param(
             {"b": 2, "c": "3", "d": [1, 2, "3"]},
-            DictOf(UnionExp(Type(int), Type(str), ListOf(Type(int)))),
+            DictOf(UnionExp(INT, STR, LIST_INT)),
         ),
         pytest.param(
             {"b": None, "b": 2, "c": "3", "d": [1, 2, "3"]},
-            DictOf(UnionExp(Type(int), Type(str), ListOf(Type(int)))),
+            DictOf(UnionExp(INT, STR, LIST_INT)),
         ),
         pytest.param(
             [1, "2", 3.0],
             ListOf(UnionExp(Type(int, BoxA), Type(str, BoxB))),
         ),
+        pytest.param(
+            [1, True],
+            ListOf(UnionExp(INT, STR)),
+        ),
+        pytest.param(
+            1,
+            UnionExp(Type(bool), STR),
+        ),
     ],
 )
 def test_union_type_expression_parser_fails(value: Any, parser: Parser) -> None:
@@ -570,57 +710,57 @@ def test_union_type_expression_parser_fails(value: Any, parser: Parser) -> None:
 
 
 @pytest.mark.parametrize(
-    ["value", "parser", "expected"],
+    ["value", "parser_factory", "expected"],
     [
         pytest.param(
             {"a": [1, 2, 3], "b": 123},
-            DictExp(
+            lambda: DictExp(
                 {
-                    "a": UnionExp(Type(list), Type(int)),
-                    "b": UnionExp(Type(list), Type(int)),
+                    "a": UnionExp(LIST, INT),
+                    "b": UnionExp(LIST, INT),
                 }
             ),
             {"a": [1, 2, 3], "b": 123},
         ),
         pytest.param(
             {"a": 2},
-            DictExp(
+            lambda: DictExp(
                 {
-                    "a": UnionExp(Type(list), Type(int)),
+                    "a": UnionExp(LIST, INT),
                 }
             ),
             {"a": 2},
         ),
         pytest.param(
             {"a": 2},
-            DictExp(
+            lambda: DictExp(
                 {
-                    "a": UnionExp(Type(list, Box), Type(int, Box)),
+                    "a": UnionExp(Type(list, Box), BOX_INT),
                 }
             ),
             {"a": Box(2)},
         ),
         pytest.param(
             {"a": 2},
-            DictExp(
+            lambda: DictExp(
                 {
-                    "a": Opt(Type(int, Box)),
+                    "a": Opt(BOX_INT),
                 }
             ),
             {"a": Box(2)},
         ),
         pytest.param(
             {},
-            DictExp(
+            lambda: DictExp(
                 {
-                    "a": Opt(Type(int, Box)),
+                    "a": Opt(BOX_INT),
                 }
             ),
             {},
         ),
         pytest.param(
             {"a": 2},
-            DictExp(
+            lambda: DictExp(
                 {
                     "a": UnionExp(
                         ListOf(Enumerated([1, 2, 3]), Box),
@@ -632,37 +772,40 @@ def test_union_type_expression_parser_fails(value: Any, parser: Parser) -> None:
         ),
         pytest.param(
             {"a": None},
-            DictExp({"a": Enumerated([1, 2, 3, None], Box)}),
+            lambda: DictExp({"a": Enumerated([1, 2, 3, None], Box)}),
             {"a": Box(None)},
         ),
     ],
 )
-def test_dict_type_expression_parser(value: Any, parser: Parser, expected: Any) -> None:
-    assert parser.parse_value(value) == expected
+def test_dict_type_expression_parser(
+    value: Any, parser_factory: Callable[[], Parser], expected: Any
+) -> None:
+    # Rows build their parsers on use, so that larger trees only live during their own test
+    assert parser_factory().parse_value(value) == expected
 
 
 @pytest.mark.parametrize(
-    ["value", "parser"],
+    ["value", "parser_factory"],
     [
         pytest.param(
             {"a": [1, 2, 3], "b": 123},
-            DictExp(
+            lambda: DictExp(
                 {
-                    "a": UnionExp(Type(list), Type(int)),
+                    "a": UnionExp(LIST, INT),
                 }
             ),
         ),
         pytest.param(
             {"a": 2},
-            DictExp(
+            lambda: DictExp(
                 {
-                    "a": UnionExp(Type(list), Type(str)),
+                    "a": UnionExp(LIST, STR),
                 }
             ),
         ),
         pytest.param(
             {"a": 2},
-            DictExp(
+            lambda: DictExp(
                 {
                     "a": UnionExp(Type(list, Box), Type(str, Box)),
                 }
@@ -670,7 +813,7 @@ def test_dict_type_expression_parser(value: Any, parser: Parser, expected: Any)
         ),
         pytest.param(
             {"a": 20},
-            DictExp(
+            lambda: DictExp(
                 {
                     "a": UnionExp(
                         ListOf(Enumerated([1, 2, 3]), Box),
@@ -679,13 +822,31 @@ def test_dict_type_expression_parser(value: Any, parser: Parser, expected: Any)
                 }
             ),
         ),
+        pytest.param(
+            {"a": True},
+            lambda: DictExp({"a": Enumerated([1, 2, 3])}),
+        ),
+        pytest.param(
+            {"a": [1]},
+            lambda: DictExp({"a": Enumerated([1, 2, 3])}),
+        ),
+        pytest.param(
+            {"a": 1, "b": True},
+            lambda: DictExp({"a": INT, "b": INT}),
+        ),
+        pytest.param(
+            {"a": 1, "b": "2"},
+            lambda: DictExp({"a": INT, "b": Opt(INT)}),
+        ),
     ],
 )
-def test_dict_type_expression_parser_fails(value: Any, parser: Parser) -> None:
+def test_dict_type_expression_parser_fails(
+    value: Any, parser_factory: Callable[[], Parser]
+) -> None:
     with pytest.raises(
         SyntaxPrasingError,
     ):
-        parser.parse_value(value)
+        parser_factory().parse_value(value)
 
 
 def test_scoped_type_expression_parser() -> None:
@@ -693,7 +854,7 @@ def test_scoped_type_expression_parser() -> None:
         "Tree",
         parser_assembler=lambda scoped: {
             "Node": UnionExp(
-                Type(int),
+                INT,
                 DictExp(
                     {
                         "Left": scoped("Node"),
@@ -750,3 +911,198 @@ def test_scoped_type_expression_parser() -> None:
                 "Right": {"Right": 1, "Left": None},
             }
         )
+
+
+def test_scoped_type_expression_parser_unknown_name() -> None:
+    with pytest.raises(ValueError, match="Tree::Leaf does not exist"):
+        Scope(
+            "Tree",
+            parser_assembler=lambda scoped: {
+                "Node": UnionExp(INT, ListOf(scoped("Leaf"))),
+            },
+        )
+
+
+def test_tagged_union_type_expression_parser() -> None:
+    parser = UnionExp(
+        DictExp({"kind": Const("int"), "value": INT}, BoxA),
+        DictExp({"kind": Const("str"), "value": STR}, BoxB),
+        DictExp({"kind": Const("none"), "value": Opt(NONE)}),
+    )
+
+    assert parser.parse_value({"kind": "int", "value": 1}) == BoxA({"kind": "int", "value": 1})
+    assert parser.parse_value({"kind": "str", "value": "1"}) == BoxB({"kind": "str", "value": "1"})
+    assert parser.parse_value({"kind": "none"}) == {"kind": "none"}
+    assert parser.is_matching({"kind": "str", "value": "1"})
+    assert not parser.is_matching({"kind": "str", "value": 1})
+    assert not parser.is_matching({"kind": ["str"], "value": "1"})
+
+    for value in [
+        {"kind": "int", "value": "1"},
+        {"kind": "float", "value": 1.0},
+        {"kind": ["int"], "value": 1},
+        {"value": 1},
+        [1],
+    ]:
+        with pytest.raises(SyntaxPrasingError):
+            parser.parse_value(value)
+
+
+def test_compiled_parser_is_shared_between_equal_structures() -> None:
+    def make_parser(tag: Any) -> Parser:
+        return DictExp({"kind": Const(tag), "values": LIST_INT, "extra": Opt(STR)}, BoxA)
+
+    assert make_parser("a").get_compiled() is make_parser("a").get_compiled()
+    assert Identity(make_parser("a")).get_compiled() is make_parser("a").get_compiled()
+    assert make_parser(1).get_compiled() is not make_parser(True).get_compiled()
+    assert INT.get_compiled() is not Type(int, BoxA).get_compiled()
+
+    with pytest.raises(SyntaxPrasingError):
+        make_parser("b").parse_value({"kind": "a", "values": []})
+    assert make_parser(True).parse_value({"kind": True, "values": [1]}) == BoxA({"kind": True, "values": [1]})
+
+
+class UninternedDictExp(DictExp):
+    _is_interned = False
+
+
+def test_compiled_parser_keeps_key_types_apart() -> None:
+    assert list(UninternedDictExp({1: INT}).parse_value({1: 5})) == [1]
+    (key,) = UninternedDictExp({True: INT}).parse_value({True: 5})
+    assert key is True
+
+
+def test_equal_parsers_are_interned() -> None:
+    assert Type(int) is INT
+    assert UnionExp(Const(None), Type(int)) is OPT_INT
+    assert DictExp({"a": Opt(Type(int)), "b": Enumerated([1, "1"])}) is DictExp(
+        {"a": Opt(Type(int)), "b": Enumerated([1, "1"])}
+    )
+    assert DictExp({"a": INT, "b": STR}) is not DictExp({"b": STR, "a": INT})
+    assert DictExp({True: INT}) is not DictExp({1: INT})
+    assert Const(1) is not Const(True)
+    assert Enumerated([1]) is not Enumerated([1.0])
+    assert Type(int, BoxA) is not Type(int, BoxB)
+
+
+def build_tree_scope() -> Scope:
+    return Scope(
+        "Tree",
+        parser_assembler=lambda scoped: {
+            "Node": UnionExp(INT, DictExp({"Left": scoped("Node"), "Right": Opt(scoped("Node"))}))
+        },
+    )
+
+
+def test_scoped_parsers_are_not_interned() -> None:
+    node = build_tree_scope().get_scoped_parser("Node")
+    assert node is not build_tree_scope().get_scoped_parser("Node")
+
+    node_ref = weakref.ref(node)
+    del node
+    gc.collect()
+    assert node_ref() is None
+
+
+def test_compiled_scoped_parsers_are_collected() -> None:
+    node = build_tree_scope().get_scoped_parser("Node")
+    assert node.parse_value({"Left": 1, "Right": {"Left": 2}}) == {"Left": 1, "Right": {"Left": 2}}
+
+    node_ref = weakref.ref(node)
+    del node
+    gc.collect()
+    assert node_ref() is None
+
+
+def test_scoped_parser_shares_results_of_repeated_objects() -> None:
+    node = build_tree_scope().get_scoped_parser("Node")
+    left = {"Left": 1}
+    result = node.parse_value({"Left": left, "Right": left})
+
+    assert result == {"Left": {"Left": 1}, "Right": {"Left": 1}}
+    assert result["Left"] is result["Right"]
+    assert node.parse_value({"Left": left})["Left"] is not result["Left"]
+
+
+def test_union_type_expression_parser_flattens_nesting() -> None:
+    parser = UnionExp(NONE, UnionExp(INT, STR), UnionExp(LIST, constructor=Box))
+    assert parser.matchers == (NONE, INT, STR, UnionExp(LIST, constructor=Box))
+    assert parser.parse_value("a") == "a"
+    assert parser.parse_value([1]) == Box([1])
+
+
+def test_parse_error_message() -> None:
+    parser = UnionExp(DictExp({"a": INT}), ListOf(STR))
+
+    with pytest.raises(SyntaxPrasingError) as error:
+        parser.parse_value({"a": "x"})
+
+    assert str(error.value) == (
+        "Failed to parse {'a': 'x'}, expected \n"
+        + parser.get_syntax_string(True)
+        + "\nFailed to parse x, expected \nint"
+    )
+
+
+def test_parse_error_is_formatted_when_leaving_parse_value() -> None:
+    parser, target = DictExp({"a": INT}), {"a": 1, "b": 2}
+    with pytest.raises(SyntaxPrasingError) as error:
+        parser.parse_value(target)
+
+    target["a"] = 5
+    assert error.value.args == (
+        "Failed to parse {'a': 1, 'b': 2}, expected \n"
+        + parser.get_syntax_string(True)
+        + '\nUnexpected key "b"',
+    )
+    assert pickle.loads(pickle.dumps(error.value)).args == error.value.args
+
+
+def test_scoped_type_expression_parser_reparsed_subtrees() -> None:
+    built: list[dict] = []
+
+    def build(node: dict) -> dict:
+        built.append(node)
+        return node
+
+    scope = Scope(
+        "Chain",
+        parser_assembler=lambda scoped: {
+            "Node": UnionExp(
+                DictExp({"next": scoped("Node"), "value": INT}, build),
+                DictExp({"next": scoped("Node"), "value": STR}, build),
+                NONE,
+            ),
+        },
+    )
+
+    # Every node is first parsed with the int alternative, which fails only after parsing the rest of the chain
+    chain: Optional[dict[str, Any]] = None
+    for _ in range(40):
+        chain = {"next": chain, "value": "x"}
+
+    assert scope.get_scoped_parser("Node").parse_value(chain) == chain
+    assert len(built) == 40
+
+
+@pytest.mark.parametrize(
+    ["value", "is_matching"],
+    [
+        pytest.param([1, 2], True),
+        pytest.param({"a": 1}, True),
+        pytest.param("a", True),
+        pytest.param([1, True], False),
+        pytest.param((1, 2), False),
+        pytest.param([1], False),
+        pytest.param("b", False),
+    ],
+)
+def test_enum_type_expression_parser_unhashable_values(value: Any, is_matching: bool) -> None:
+    parser = Enumerated([[1, 2], {"a": 1}, "a"], Box)
+
+    assert parser.is_matching(value) == is_matching
+    if is_matching:
+        assert parser.parse_value(value) == Box(value)
+    else:
+        with pytest.raises(SyntaxPrasingError):
+            parser.parse_value(value)
@@ -1,51 +1,49 @@
-from dataclasses import dataclass
-from typing import Any, Optional
+from dataclasses import astuple, dataclass
+import json
+from operator import attrgetter
+from pathlib import Path
+from typing import Any, Callable, Optional
 import pytest
 
-from src.solution_tree import Matcher, Query, SolutionTree, ValueMatcher
+from src.solution_tree import (
+    Condition,
+    Matcher,
+    Query,
+    ReachabilityException,
+    Setter,
+    SolutionTree,
+    SwitchApplyAll,
+    ValueMatcher,
+)
+
+
+def select_itself(value: Any) -> Any:
+    return value
 
 
 def vmatch(*values: Any) -> ValueMatcher[Any, Any]:
-    return ValueMatcher(lambda x: x, values)
+    return ValueMatcher(select_itself, frozenset(values))
 
 
 @pytest.mark.parametrize(
     ["left", "right", "expected"],
     [
-        pytest.param(
-            vmatch("a", "b", "c"),
-            vmatch("a", "b", "c"),
-            vmatch("a", "b", "c"),
-            id="value matcher identity",
-        ),
-        pytest.param(
-            vmatch("a", "c"),
-            vmatch("a", "b", "c"),
-            vmatch("a", "c"),
-            id="value matcher intersection 1",
-        ),
-        pytest.param(
-            vmatch("c"),
-            vmatch("a", "b", "c"),
-            vmatch("c"),
-            id="value matcher intersection 2",
-        ),
-        pytest.param(
-            vmatch("a", "b", "c"),
-            vmatch("a", "c"),
-            vmatch("a", "c"),
-            id="value matcher intersection 3",
-        ),
-        pytest.param(
-            vmatch(None, "a", "b"),
-            vmatch("a", "b", "c"),
-            vmatch("a", "b"),
-            id="None is also a value",
-        ),
-        pytest.param(
-            vmatch(None), vmatch("a", "b", "c"), None, id="Empty intersection 1"
-        ),
-        pytest.param(vmatch("b"), vmatch("a", "c"), None, id="Empty intersection 2"),
+        (vmatch("a", "b", "c"), vmatch("a", "b", "c"), vmatch("a", "b", "c")),
+        (vmatch("a", "c"), vmatch("a", "b", "c"), vmatch("a", "c")),
+        (vmatch("c"), vmatch("a", "b", "c"), vmatch("c")),
+        (vmatch("a", "b", "c"), vmatch("a", "c"), vmatch("a", "c")),
+        (vmatch(None, "a", "b"), vmatch("a", "b", "c"), vmatch("a", "b")),
+        (vmatch(None), vmatch("a", "b", "c"), None),
+        (vmatch("b"), vmatch("a", "c"), None),
+    ],
+    ids=[
+        "value matcher identity",
+        "value matcher intersection 1",
+        "value matcher intersection 2",
+        "value matcher intersection 3",
+        "None is also a value",
+        "Empty intersection 1",
+        "Empty intersection 2",
     ],
 )
 def test_value_matcher_intersection(
@@ -72,154 +70,300 @@ def test_value_matcher(
     assert matcher.match(value) == expected
 
 
-temp_selectors = {
-    "a": lambda _: 1,
-    "b": lambda _: 2,
-    "c": lambda _: 3,
-}
-
+@pytest.mark.parametrize(
+    ["value", "expected"],
+    [
+        pytest.param(("a", 1), True),
+        pytest.param(("b", 2), True),
+        pytest.param(("c", 1), False),
+        pytest.param(("a", 3), False),
+    ],
+)
+def test_query_match(value: tuple[str, int], expected: bool) -> None:
+    query: Query[tuple[str, int]] = Query(
+        {
+            "letter": ValueMatcher(lambda x: x[0], ["a", "b"]),
+            "number": ValueMatcher(lambda x: x[1], [1, 2]),
+            "length": ValueMatcher(len, [2]),
+        },
+        {},
+    )
 
-@dataclass
-class Apple:
-    family: str
-    color: str
-    size: str
+    assert query.match(value) == expected
+    assert Query[Any]({}, {}).match(value)
 
 
 @pytest.mark.parametrize(
-    ["value_object", "output"],
+    ["left", "right", "expected"],
     [
         pytest.param(
-            Apple("Granny Green", "green", "small"),
-            {"is good": True},
-        ),
-        pytest.param(
-            Apple("Granny Green", "red", "small"),
-            {"is good": False},
-        ),
-        pytest.param(
-            Apple("Juicy Red", "red", "small"),
-            {"is good": True},
-        ),
-        pytest.param(
-            Apple("Juicy Red", "red", "big"),
-            {"is good": False},
-        ),
-        pytest.param(
-            Apple("Big Red", "red", "big"),
-            {"is good": True},
-        ),
-        pytest.param(
-            Apple("Big Red", "green", "big"),
-            {"is good": False},
+            {"a": vmatch("a", "b")},
+            {"b": vmatch("c")},
+            {"a": vmatch("a", "b"), "b": vmatch("c")},
+            id="disjoint keys",
         ),
         pytest.param(
-            Apple("Big Red", "blue", "big"),
-            {"is good": False},
+            {"a": vmatch("a", "b"), "b": vmatch("c")},
+            {"a": vmatch("b", "c")},
+            {"a": vmatch("b"), "b": vmatch("c")},
+            id="shared key",
         ),
         pytest.param(
-            Apple("Big Red", "red", "small"),
-            {"is good": False},
+            {"a": vmatch("a"), "b": vmatch("c")},
+            {"b": vmatch("d"), "a": vmatch("a")},
+            None,
+            id="empty intersection",
         ),
     ],
 )
-def test_tree_matcher_first_match_flat_single_values(
-    value_object: Apple, output: dict[str, Any]
+def test_query_intersection(
+    left: dict[str, Matcher[Any]],
+    right: dict[str, Matcher[Any]],
+    expected: Optional[dict[str, Matcher[Any]]],
 ) -> None:
-    tree: SolutionTree[Apple, dict[str, bool]] = SolutionTree(
+    assert Query(left, {}).intersect(Query(right, {})) == (None if expected is None else Query(expected, {}))
+
+
+@pytest.mark.parametrize(
+    ["update_dict", "expected"],
+    [
+        pytest.param({}, {"a": 0, "b": 0}),
+        pytest.param({"a": 1}, {"a": 1, "b": 0}),
+        pytest.param({"b": [1], "c": None}, {"a": 0, "b": [1], "c": None}),
+    ],
+)
+def test_setter_update(update_dict: dict[str, Any], expected: dict[str, Any]) -> None:
+    output = {"a": 0, "b": 0}
+    Setter[dict[str, Any]](update_dict).update(output)
+    assert output == expected
+
+
+@pytest.mark.parametrize(
+    ["setter", "subconditions", "expected"],
+    [
+        pytest.param(None, None, {}),
+        pytest.param(Setter({"a": 1}), None, {"a": 1}),
+        pytest.param(None, [{"b": 2}], {"b": 2}),
+        pytest.param(Setter({"a": 1}), [{"b": 2}, {"a": 3}], {"a": 3, "b": 2}),
+    ],
+)
+def test_condition_match(
+    setter: Optional[Setter[dict[str, Any]]],
+    subconditions: Optional[list[dict[str, Any]]],
+    expected: dict[str, Any],
+) -> None:
+    def condition(values: list[str], setter: Optional[Setter[dict[str, Any]]], subconditions: Any = None) -> Condition:
+        return Condition(Query({"x": vmatch(*values)}, {}), setter, None, subconditions)
+
+    switch = None if subconditions is None else SwitchApplyAll(
+        [condition(["a"], Setter(update_dict)) for update_dict in subconditions]
+    )
+
+    output: dict[str, Any] = {}
+    assert not condition(["b"], setter, switch).match("a", output)
+    assert output == {}
+    assert condition(["a", "b"], setter, switch).match("a", output)
+    assert output == expected
+
+
+@dataclass(frozen=True, slots=True)
+class Apple:
+    family: str
+    color: str
+    size: str
+
+
+def apple_id(value: Any) -> Optional[str]:
+    return "/".join(astuple(value)) if isinstance(value, (Apple, Apple2)) else None
+
+
+APPLE_SELECTORS: dict[str, Callable[[Apple], Any]] = {
+    "family": attrgetter("family"),
+    "color": attrgetter("color"),
+    "size": attrgetter("size"),
+}
+
+
+# Rows with the same outcome in both flat trees
+FLAT_CASES = [
+    pytest.param(
+        Apple("Granny Green", "green", "small"),
+        {"is good": True},
+    ),
+    pytest.param(
+        Apple("Granny Green", "red", "small"),
+        {"is good": False},
+    ),
+    pytest.param(
+        Apple("Juicy Red", "red", "small"),
+        {"is good": True},
+    ),
+    pytest.param(
+        Apple("Juicy Red", "red", "big"),
+        {"is good": False},
+    ),
+    pytest.param(
+        Apple("Big Red", "red", "big"),
+        {"is good": True},
+    ),
+    pytest.param(
+        Apple("Big Red", "green", "big"),
+        {"is good": False},
+    ),
+    pytest.param(
+        Apple("Big Red", "red", "small"),
+        {"is good": False},
+    ),
+]
+
+
+FLAT_SCHEMA_1 = {
+    "schema": {
+        "selectors": {
+            "family": [
+                "Granny Green",
+                "Juicy Red",
+                "Big Red",
+            ],
+            "color": [
+                "green",
+                "red",
+                "blue",
+            ],
+            "size": [
+                "small",
+                "big",
+            ],
+        },
+        "output": {"is good": "bool"},
+    },
+    "apply first": [
         {
-            "schema": {
-                "selectors": {
-                    "family": [
-                        "Granny Green",
-                        "Juicy Red",
-                        "Big Red",
-                    ],
-                    "color": [
-                        "green",
-                        "red",
-                        "blue",
-                    ],
-                    "size": [
-                        "small",
-                        "big",
-                    ],
-                },
-                "output": {"is good": "bool"},
+            "when": {"family": ["Granny Green"], "color": ["green"]},
+            "set": {"is good": True},
+        },
+        {
+            "when": {
+                "family": "Juicy Red",
+                "color": "red",
+                "size": "small",
             },
-            "apply first": [
-                {
-                    "when": {"family": ["Granny Green"], "color": ["green"]},
-                    "set": {"is good": True},
-                },
-                {
-                    "when": {
-                        "family": "Juicy Red",
-                        "color": "red",
-                        "size": "small",
-                    },
-                    "set": {"is good": True},
-                },
-                {
-                    "when": {
-                        "family": "Big Red",
-                        "color": "red",
-                        "size": "big",
-                    },
-                    "set": {"is good": True},
-                },
-                {"when": {}, "set": {"is good": False}},
-            ],
+            "set": {"is good": True},
         },
         {
-            "family": lambda apple: apple.family,
-            "color": lambda apple: apple.color,
-            "size": lambda apple: apple.size,
+            "when": {
+                "family": "Big Red",
+                "color": "red",
+                "size": "big",
+            },
+            "set": {"is good": True},
         },
-    )
+        {"when": {}, "set": {"is good": False}},
+    ],
+}
 
-    assert tree.match_update(value_object) == output
+
+@pytest.fixture(scope="module")
+def flat_single_tree() -> SolutionTree[Apple, dict[str, Any]]:
+    return SolutionTree(FLAT_SCHEMA_1, APPLE_SELECTORS)
 
 
 @pytest.mark.parametrize(
     ["value_object", "output"],
-    [
+    FLAT_CASES
+    + [
         pytest.param(
-            Apple("Granny Green", "green", "small"),
-            {
-                "is good": True,
-            },
+            Apple("Big Red", "blue", "big"),
+            {"is good": False},
         ),
-        pytest.param(
-            Apple("Granny Green", "red", "small"),
-            {
+    ],
+    ids=apple_id,
+)
+def test_tree_matcher_first_match_flat_single_values(
+    flat_single_tree: SolutionTree[Apple, dict[str, Any]], value_object: Apple, output: dict[str, Any]
+) -> None:
+    assert flat_single_tree.match_update(value_object) == output
+
+
+FLAT_SCHEMA_2 = {
+    "schema": {
+        "selectors": {
+            "family": [
+                "Granny Green",
+                "Juicy Red",
+                "Big Red",
+            ],
+            "color": [
+                "green",
+                "red",
+                "blue",
+            ],
+            "size": [
+                "small",
+                "big",
+            ],
+        },
+        "output": {
+            "is good": "bool",
+            "new type of apple": "bool",
+        },
+    },
+    "apply first": [
+        {
+            "when": {"color": "blue"},
+            "set": {
                 "is good": False,
+                "new type of apple": True,
             },
-        ),
-        pytest.param(
-            Apple("Juicy Red", "red", "small"),
-            {
+        },
+        {
+            "when": {
+                "family": "Granny Green",
+                "color": "green",
+            },
+            "set": {
                 "is good": True,
             },
-        ),
-        pytest.param(
-            Apple("Juicy Red", "red", "big"),
-            {
-                "is good": False,
+        },
+        {
+            "when": {
+                "family": "Juicy Red",
+                "color": "red",
+                "size": "small",
             },
-        ),
-        pytest.param(
-            Apple("Big Red", "red", "big"),
-            {
+            "set": {
                 "is good": True,
             },
-        ),
-        pytest.param(
-            Apple("Big Red", "green", "big"),
-            {
+        },
+        {
+            "when": {
+                "family": "Big Red",
+                "color": "red",
+                "size": "big",
+            },
+            "set": {
+                "is good": True,
+            },
+        },
+        {
+            "when": {},
+            "set": {
                 "is good": False,
             },
-        ),
+        },
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def flat_single_tree_2() -> SolutionTree[Apple, dict[str, Any]]:
+    return SolutionTree(FLAT_SCHEMA_2, APPLE_SELECTORS)
+
+
+@pytest.mark.parametrize(
+    ["value_object", "output"],
+    FLAT_CASES
+    + [
         pytest.param(
             Apple("Big Red", "blue", "big"),
             {
@@ -227,49 +371,52 @@ def test_tree_matcher_first_match_flat_single_values(
                 "new type of apple": True,
             },
         ),
-        pytest.param(
-            Apple("Big Red", "red", "small"),
-            {
-                "is good": False,
-            },
-        ),
     ],
+    ids=apple_id,
 )
 def test_tree_matcher_first_match_flat_single_values_2(
-    value_object: Apple, output: dict[str, Any]
+    flat_single_tree_2: SolutionTree[Apple, dict[str, Any]], value_object: Apple, output: dict[str, Any]
 ) -> None:
-    tree: SolutionTree[Apple, dict[str, bool]] = SolutionTree(
+    assert flat_single_tree_2.match_update(value_object) == output
+
+
+MULTI_VALUES_SCHEMA = {
+    "schema": {
+        "selectors": {
+            "family": [
+                "Granny Green",
+                "Juicy Red",
+                "Big Red",
+                "Strange Family",
+            ],
+            "color": [
+                "green",
+                "red",
+                "blue",
+                "violet",
+            ],
+            "size": [
+                "small",
+                "big",
+                "extra",
+                "ex-extra",
+            ],
+        },
+        "output": {
+            "is good": "bool",
+            "new type of apple": "bool",
+            "unprocessable": "bool",
+        },
+    },
+    "apply first": [
         {
-            "schema": {
-                "selectors": {
-                    "family": [
-                        "Granny Green",
-                        "Juicy Red",
-                        "Big Red",
-                    ],
-                    "color": [
-                        "green",
-                        "red",
-                        "blue",
-                    ],
-                    "size": [
-                        "small",
-                        "big",
-                    ],
-                },
-                "output": {
-                    "is good": "bool",
-                    "new type of apple": "bool",
-                },
+            "when": {
+                "family": ["Granny Green", "Juicy Red", "Big Red"],
             },
-            "apply first": [
-                {
-                    "when": {"color": "blue"},
-                    "set": {
-                        "is good": False,
-                        "new type of apple": True,
-                    },
-                },
+            "set": {
+                "is good": False,
+            },
+            "also": [
                 {
                     "when": {
                         "family": "Granny Green",
@@ -278,6 +425,12 @@ def test_tree_matcher_first_match_flat_single_values_2(
                     "set": {
                         "is good": True,
                     },
+                    "also": [
+                        {
+                            "when": {"size": "ex-extra"},
+                            "set": {"new type of apple": True},
+                        }
+                    ],
                 },
                 {
                     "when": {
@@ -293,294 +446,396 @@ def test_tree_matcher_first_match_flat_single_values_2(
                     "when": {
                         "family": "Big Red",
                         "color": "red",
-                        "size": "big",
+                        "size": ["big", "extra"],
                     },
                     "set": {
                         "is good": True,
                     },
                 },
                 {
-                    "when": {},
-                    "set": {
-                        "is good": False,
-                    },
+                    "when": {"color": ["blue", "violet"]},
+                    "set": {"new type of apple": True},
                 },
             ],
         },
-        {
-            "family": lambda apple: apple.family,
-            "color": lambda apple: apple.color,
-            "size": lambda apple: apple.size,
-        },
-    )
+        {"when": {}, "set": {"unprocessable": True, "new type of apple": True}},
+    ],
+}
 
-    assert tree.match_update(value_object) == output
+
+@pytest.fixture(scope="module")
+def multi_values_tree() -> SolutionTree[Apple, dict[str, Any]]:
+    return SolutionTree(MULTI_VALUES_SCHEMA, APPLE_SELECTORS)
+
+
+# Outputs of the multi-values tree by apple (family, color, size)
+EXPECTED_MULTI_VALUES: dict[tuple[str, str, str], dict[str, bool]] = {
+    ("Granny Green", "green", "small"): {"is good": True},
+    ("Granny Green", "green", "big"): {"is good": True},
+    ("Granny Green", "green", "extra"): {"is good": True},
+    ("Granny Green", "green", "ex-extra"): {"is good": True, "new type of apple": True},
+    ("Granny Green", "red", "small"): {"is good": False},
+    ("Granny Green", "red", "big"): {"is good": False},
+    ("Granny Green", "red", "extra"): {"is good": False},
+    ("Juicy Red", "red", "small"): {"is good": True},
+    ("Juicy Red", "red", "big"): {"is good": False},
+    ("Juicy Red", "red", "extra"): {"is good": False},
+    ("Big Red", "red", "small"): {"is good": False},
+    ("Big Red", "red", "big"): {"is good": True},
+    ("Big Red", "red", "extra"): {"is good": True},
+    ("Big Red", "blue", "extra"): {"is good": False, "new type of apple": True},
+    ("Big Red", "violet", "extra"): {"is good": False, "new type of apple": True},
+}
 
 
 @pytest.mark.parametrize(
     ["value_object", "output"],
-    [
-        pytest.param(
-            Apple("Granny Green", "green", "small"),
-            {
-                "is good": True,
-            },
-        ),
-        pytest.param(
-            Apple("Granny Green", "green", "big"),
-            {
-                "is good": True,
-            },
-        ),
-        pytest.param(
-            Apple("Granny Green", "green", "extra"),
-            {
-                "is good": True,
+    [pytest.param(Apple(*fields), output) for fields, output in EXPECTED_MULTI_VALUES.items()],
+    ids=apple_id,
+)
+def test_tree_matcher_first_match_multi_values_2(
+    multi_values_tree: SolutionTree[Apple, dict[str, Any]], value_object: Apple, output: dict[str, Any]
+) -> None:
+    assert multi_values_tree.match_update(value_object) == output
+
+
+@dataclass(frozen=True, slots=True)
+class Apple2:
+    family: str
+    size: str
+
+
+APPLE2_SELECTORS: dict[str, Callable[[Apple2], Any]] = {
+    "family": attrgetter("family"),
+    "size": attrgetter("size"),
+}
+
+
+MULTI_OUTPUTS_SCHEMA = {
+    "schema": {
+        "selectors": {
+            "family": [
+                "Granny Green",
+                "Juicy Red",
+                "Big Red",
+            ],
+            "size": [
+                "small",
+                "big",
+                "extra",
+                "ex-extra",
+            ],
+        },
+        "output": {
+            "tags": {"list of": "str"},
+        },
+    },
+    "apply first": [
+        {
+            "when": {
+                "family": "Granny Green",
             },
-        ),
-        pytest.param(
-            Apple("Granny Green", "green", "ex-extra"),
-            {
-                "is good": True,
-                "new type of apple": True,
+            "set": {"tags": ["green"]},
+        },
+        {
+            "when": {
+                "family": "Juicy Red",
             },
-        ),
-        pytest.param(
-            Apple("Granny Green", "red", "small"),
-            {
-                "is good": False,
+            "set": {"tags": ["red", "reddish-yellow"]},
+        },
+        {
+            "when": {
+                "family": "Big Red",
             },
-        ),
+            "set": {"tags": ["red"]},
+        },
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def multi_outputs_tree() -> SolutionTree[Apple2, dict[str, Any]]:
+    return SolutionTree(MULTI_OUTPUTS_SCHEMA, APPLE2_SELECTORS)
+
+
+@pytest.mark.parametrize(
+    ["value_object", "output"],
+    [
         pytest.param(
-            Apple("Granny Green", "red", "big"),
+            Apple2("Granny Green", "small"),
             {
-                "is good": False,
+                "tags": ["green"],
             },
         ),
         pytest.param(
-            Apple("Granny Green", "red", "extra"),
+            Apple2("Juicy Red", "small"),
             {
-                "is good": False,
+                "tags": ["red", "reddish-yellow"],
             },
         ),
         pytest.param(
-            Apple("Juicy Red", "red", "small"),
+            Apple2("Big Red", "small"),
             {
-                "is good": True,
+                "tags": ["red"],
             },
         ),
-        pytest.param(
-            Apple("Juicy Red", "red", "big"),
-            {
-                "is good": False,
+    ],
+    ids=apple_id,
+)
+def test_tree_matcher_first_match_multi_outputs(
+    multi_outputs_tree: SolutionTree[Apple2, dict[str, Any]], value_object: Apple2, output: dict[str, Any]
+) -> None:
+    assert multi_outputs_tree.match_update(value_object) == output
+
+
+def test_tree_matcher_match_update_into() -> None:
+    tree: SolutionTree[Apple2, dict[str, Any]] = SolutionTree(
+        {
+            "schema": {
+                "selectors": {"family": ["Granny Green", "Big Red"]},
+                "output": {"tags": {"list of": "str"}, "is good": "bool"},
             },
-        ),
-        pytest.param(
-            Apple("Juicy Red", "red", "extra"),
-            {
-                "is good": False,
+            "apply all": [
+                {"when": {"family": "Granny Green"}, "set": {"tags": ["green"]}},
+                {"when": {"family": "Big Red"}, "set": {"tags": ["red"]}},
+            ],
+        },
+        {"family": attrgetter("family")},
+    )
+
+    output: dict[str, Any] = {"is good": True}
+    assert tree.match_update_into(Apple2("Granny Green", "small"), output) is output
+    assert output == {"tags": ["green"]}
+
+
+def test_tree_accepts_test_schema() -> None:
+    tree: SolutionTree[Apple2, dict[str, Any]] = SolutionTree(
+        MULTI_OUTPUTS_SCHEMA,
+        APPLE2_SELECTORS,
+        test_schema=True,
+    )
+
+    assert tree.match_update(Apple2("Big Red", "small")) == {"tags": ["red"]}
+
+
+def test_tree_matcher_match_update_many() -> None:
+    calls: list[str] = []
+
+    def select_family(apple: Apple2) -> str:
+        calls.append(apple.family)
+        return apple.family
+
+    tree: SolutionTree[Apple2, dict[str, Any]] = SolutionTree(
+        {
+            "schema": {
+                "selectors": {"family": ["Granny Green", "Big Red"]},
+                "output": {"tags": {"list of": "str"}},
             },
-        ),
-        pytest.param(
-            Apple("Big Red", "red", "small"),
-            {
-                "is good": False,
+            "apply all": [
+                {"when": {"family": "Granny Green"}, "set": {"tags": ["green"]}},
+                {"when": {"family": "Big Red"}, "set": {"tags": ["red"]}},
+            ],
+        },
+        {"family": select_family},
+    )
+
+    apples = [Apple2("Big Red", "small"), Apple2("Granny Green", "small"), Apple2("Apple", "big")]
+    assert tree.match_update_many(apples) == [{"tags": ["red"]}, {"tags": ["green"]}, {}]
+    assert calls == ["Big Red", "Granny Green", "Apple"]
+    assert tree.match_update(apples[0]) == {"tags": ["red"]}
+
+
+@pytest.mark.parametrize(
+    ["value_object", "output"],
+    [
+        pytest.param(Apple2("Granny Green", "small"), {"tags": ["first"]}),
+        pytest.param(Apple2("Juicy Red", "small"), {"tags": ["first"]}),
+        pytest.param(Apple2("Big Red", "small"), {"tags": ["default"]}),
+        pytest.param(Apple2("Other", "small"), {"tags": ["default"]}),
+    ],
+)
+def test_tree_matcher_first_match_single_selector(
+    value_object: Apple2, output: dict[str, Any]
+) -> None:
+    tree: SolutionTree[Apple2, dict[str, Any]] = SolutionTree(
+        {
+            "schema": {
+                "selectors": {"family": ["Granny Green", "Juicy Red", "Big Red", "Other"]},
+                "output": {"tags": {"list of": "str"}},
             },
-        ),
-        pytest.param(
-            Apple("Big Red", "red", "big"),
-            {
-                "is good": True,
+            "apply first": [
+                {"when": {"family": ["Granny Green", "Juicy Red"]}, "set": {"tags": ["first"]}},
+                {"when": {"family": "Juicy Red"}, "set": {"tags": ["second"]}},
+                {"when": {}, "set": {"tags": ["default"]}},
+                {"when": {"family": "Big Red"}, "set": {"tags": ["unreachable"]}},
+            ],
+        },
+        {"family": attrgetter("family")},
+    )
+
+    assert tree.match_update(value_object) == output
+
+
+def test_tree_repeated_clauses_are_shared() -> None:
+    tree: SolutionTree[Apple, dict[str, Any]] = SolutionTree(
+        {
+            "schema": {
+                "selectors": {"family": ["Granny Green", "Big Red"], "size": ["small", "big"]},
+                "output": {"is good": "bool"},
             },
-        ),
-        pytest.param(
-            Apple("Big Red", "red", "extra"),
+            "apply all": [
+                {"when": {"family": "Granny Green", "size": "small"}, "set": {"is good": True}},
+                {"when": {"family": ["Granny Green"], "size": "big"}, "set": {"is good": True}},
+                {"when": {"family": "Big Red"}, "set": {"is good": False}},
+            ],
+        },
+        {"family": attrgetter("family"), "size": attrgetter("size")},
+    )
+
+    first, second, third = tree.tree.conditions
+    assert first.query.matchers["family"] is second.query.matchers["family"]
+    assert first.query.matchers["size"] is not second.query.matchers["size"]
+    assert first.setter is second.setter
+    assert first.setter is not third.setter
+
+
+def test_tree_from_file(tmp_path: Path) -> None:
+    config_path = tmp_path / "tree.json"
+    config_path.write_text(
+        json.dumps(
             {
-                "is good": True,
+                "schema": {"selectors": {"family": "str"}, "output": {"tags": {"list of": "str"}}},
+                "apply first": [{"when": {"family": "Big Red"}, "set": {"tags": ["red"]}}],
+            }
+        )
+    )
+
+    tree: SolutionTree[Apple2, dict[str, Any]] = SolutionTree.from_file(
+        config_path, {"family": attrgetter("family")}
+    )
+    assert tree.match_update(Apple2("Big Red", "big")) == {"tags": ["red"]}
+
+    with pytest.raises(ValueError, match="does not exist"):
+        SolutionTree.from_file(tmp_path / "missing.json", {})
+    with pytest.raises(ValueError, match="does not exist"):
+        SolutionTree.from_file(tmp_path / ("x" * 5000 + ".json"), {})
+    with pytest.raises(ValueError, match="expected to be a file"):
+        SolutionTree.from_file(tmp_path, {})
+    with pytest.raises(ValueError, match="expected to be a JSON file"):
+        SolutionTree.from_file(config_path.rename(tmp_path / "tree.txt"), {})
+
+
+def test_tree_matcher_match_update_batch() -> None:
+    calls: list[str] = []
+
+    def select_size(apple: Apple) -> Any:
+        calls.append(apple.size)
+        return [apple.size] if apple.size == "unhashable" else apple.size
+
+    tree: SolutionTree[Apple, dict[str, Any]] = SolutionTree(
+        {
+            "schema": {
+                "selectors": {"family": "str", "size": "str"},
+                "output": {"is good": "bool"},
             },
-        ),
-        pytest.param(
-            Apple("Big Red", "blue", "extra"),
-            {"is good": False, "new type of apple": True},
-        ),
-        pytest.param(
-            Apple("Big Red", "violet", "extra"),
-            {"is good": False, "new type of apple": True},
-        ),
+            "apply first": [
+                {"when": {"family": "Big Red", "size": "big"}, "set": {"is good": True}},
+                {"when": {}, "set": {"is good": False}},
+            ],
+        },
+        {
+            "family": attrgetter("family"),
+            "size": select_size,
+            "color": attrgetter("color"),
+        },
+    )
+
+    apples = [
+        Apple("Big Red", "red", "big"),
+        Apple("Big Red", "green", "big"),
+        Apple("Juicy Red", "red", "big"),
+        Apple("Big Red", "red", "unhashable"),
+    ]
+    results = tree.match_update_batch(apples)
+    assert results == [{"is good": True}, {"is good": True}, {"is good": False}, {"is good": False}]
+    assert results == tree.match_update_many(apples)
+    assert results[0] is not results[1]
+    assert calls[:4] == ["big", "big", "big", "unhashable"]
+
+
+@pytest.mark.parametrize(
+    ["inner_family", "is_reachable"],
+    [
+        pytest.param("Big Red", True),
+        pytest.param("Granny Green", False),
     ],
 )
-def test_tree_matcher_first_match_multi_values_2(
-    value_object: Apple, output: dict[str, Any]
-) -> None:
-    tree: SolutionTree[Apple, dict[str, bool]] = SolutionTree(
+def test_tree_check_reachability(inner_family: str, is_reachable: bool) -> None:
+    tree: SolutionTree[Apple, dict[str, Any]] = SolutionTree(
         {
             "schema": {
-                "selectors": {
-                    "family": [
-                        "Granny Green",
-                        "Juicy Red",
-                        "Big Red",
-                        "Strange Family",
-                    ],
-                    "color": [
-                        "green",
-                        "red",
-                        "blue",
-                        "violet",
-                    ],
-                    "size": [
-                        "small",
-                        "big",
-                        "extra",
-                        "ex-extra",
-                    ],
-                },
-                "output": {
-                    "is good": "bool",
-                    "new type of apple": "bool",
-                    "unprocessable": "bool",
-                },
+                "selectors": {"family": ["Granny Green", "Big Red"], "size": ["small", "big"]},
+                "output": {"is good": "bool"},
             },
-            "apply first": [
+            "apply all": [
                 {
-                    "when": {
-                        "family": ["Granny Green", "Juicy Red", "Big Red"],
-                    },
-                    "set": {
-                        "is good": False,
-                    },
+                    "when": {"family": "Big Red"},
+                    "set": {},
                     "also": [
                         {
-                            "when": {
-                                "family": "Granny Green",
-                                "color": "green",
-                            },
-                            "set": {
-                                "is good": True,
-                            },
-                            "also": [
-                                {
-                                    "when": {"size": "ex-extra"},
-                                    "set": {"new type of apple": True},
-                                }
-                            ],
-                        },
-                        {
-                            "when": {
-                                "family": "Juicy Red",
-                                "color": "red",
-                                "size": "small",
-                            },
-                            "set": {
-                                "is good": True,
-                            },
-                        },
-                        {
-                            "when": {
-                                "family": "Big Red",
-                                "color": "red",
-                                "size": ["big", "extra"],
-                            },
-                            "set": {
-                                "is good": True,
-                            },
-                        },
-                        {
-                            "when": {"color": ["blue", "violet"]},
-                            "set": {"new type of apple": True},
-                        },
+                            "when": {"size": "big"},
+                            "set": {},
+                            "also": [{"when": {"family": inner_family}, "set": {"is good": True}}],
+                        }
                     ],
                 },
-                {"when": {}, "set": {"unprocessable": True, "new type of apple": True}},
             ],
         },
-        {
-            "family": lambda apple: apple.family,
-            "color": lambda apple: apple.color,
-            "size": lambda apple: apple.size,
-        },
+        {"family": attrgetter("family"), "size": attrgetter("size")},
     )
 
-    assert tree.match_update(value_object) == output
-
-
-@dataclass
-class Apple2:
-    family: str
-    size: str
+    if is_reachable:
+        tree.check_reachability()
+    else:
+        with pytest.raises(ReachabilityException):
+            tree.check_reachability()
 
 
 @pytest.mark.parametrize(
     ["value_object", "output"],
     [
-        pytest.param(
-            Apple2("Granny Green", "small"),
-            {
-                "tags": ["green"],
-            },
-        ),
-        pytest.param(
-            Apple2("Juicy Red", "small"),
-            {
-                "tags": ["red", "reddish-yellow"],
-            },
-        ),
-        pytest.param(
-            Apple2("Big Red", "small"),
-            {
-                "tags": ["red"],
-            },
-        ),
+        pytest.param(Apple2("Granny Green", "small"), {}),
+        pytest.param(Apple2("Big Red", "small"), {"tags": ["red"], "is good": True}),
+        pytest.param(Apple2("Big Red", "big"), {"tags": ["red"], "is good": True}),
     ],
 )
-def test_tree_matcher_first_match_multi_outputs(
-    value_object: Apple, output: dict[str, Any]
+def test_tree_matcher_skips_no_op_conditions(
+    value_object: Apple2, output: dict[str, Any]
 ) -> None:
-    tree: SolutionTree[Apple, dict[str, bool]] = SolutionTree(
+    tree: SolutionTree[Apple2, dict[str, Any]] = SolutionTree(
         {
             "schema": {
-                "selectors": {
-                    "family": [
-                        "Granny Green",
-                        "Juicy Red",
-                        "Big Red",
-                    ],
-                    "size": [
-                        "small",
-                        "big",
-                        "extra",
-                        "ex-extra",
-                    ],
-                },
-                "output": {
-                    "tags": {"list of": "str"},
-                },
+                "selectors": {"family": ["Granny Green", "Big Red"], "size": ["small", "big"]},
+                "output": {"tags": {"list of": "str"}, "is good": "bool"},
             },
-            "apply first": [
+            "apply all": [
+                {"when": {"size": "big"}, "set": {}, "also": [{"when": {}, "set": {}}]},
+                {"when": {"family": "Big Red"}, "set": {"tags": ["red"]}},
                 {
-                    "when": {
-                        "family": "Granny Green",
-                    },
-                    "set": {"tags": ["green"]},
-                },
-                {
-                    "when": {
-                        "family": "Juicy Red",
-                    },
-                    "set": {"tags": ["red", "reddish-yellow"]},
-                },
-                {
-                    "when": {
-                        "family": "Big Red",
+                    "when": {},
+                    "set": {},
+                    "also": {
+                        "apply first": [
+                            {"when": {"family": "Granny Green"}, "set": {}},
+                            {"when": {}, "set": {"is good": True}},
+                            {"when": {"family": "Big Red"}, "set": {}},
+                        ]
                     },
-                    "set": {"tags": ["red"]},
                 },
             ],
         },
-        {
-            "family": lambda apple: apple.family,
-            "size": lambda apple: apple.size,
-        },
+        {"family": attrgetter("family"), "size": attrgetter("size")},
     )
 
     assert tree.match_update(value_object) == output
+    assert len(tree.instructions) == 5